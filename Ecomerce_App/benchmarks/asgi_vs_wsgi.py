@@ -0,0 +1,117 @@
+"""
+WSGI vs ASGI read benchmark.
+
+Fires the hot read endpoints (product list/detail, featured, search, cart,
+order list) at the project in-process with many requests in flight: the
+WSGI handler from a thread pool of --concurrency workers, the ASGI handler
+from as many concurrent tasks on one event loop. Requests are token
+authenticated so the anonymous response cache does not answer them.
+Reports throughput and latency per handler:
+
+    python benchmarks/asgi_vs_wsgi.py --requests 2000 --concurrency 64
+
+This measures the application, not a server; compare deployments with a
+load generator against gunicorn and uvicorn for absolute numbers.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from support import format_row, setup_django, summarize, test_database
+
+
+def seed(products):
+    from cart.models import Cart, CartItem
+    from orders.models import Order
+    from store.models import Category, Product
+    from users.models import Address, CustomUser
+    from users.tokens import issue_token
+
+    category = Category.objects.create(name='Benchmark')
+    products = Product.objects.bulk_create(
+        Product(name=f'Product {i}', description='Benchmark product', price=Decimal('9.99'),
+                category=category, stock_quantity=100)
+        for i in range(products)
+    )
+    user = CustomUser.objects.create(username='bench', email='bench@example.com')
+    address = Address.objects.create(
+        user=user, street_address='1 Bench St', city='Bench', state='BE',
+        postal_code='00000', country='US', is_default=True,
+    )
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.bulk_create(CartItem(cart=cart, product=product, quantity=1) for product in products[:10])
+    Order.objects.bulk_create(
+        Order(user=user, order_number=f'BENCH-{i:06d}', shipping_address=address,
+              total_amount=Decimal('9.99'))
+        for i in range(30)
+    )
+    paths = [
+        '/api/store/products/',
+        '/api/store/products/?page=2',
+        f'/api/store/products/{products[0].pk}/',
+        '/api/store/featured/',
+        '/api/store/search/?q=Product',
+        '/api/cart/',
+        '/api/orders/',
+    ]
+    return issue_token(user).key, paths
+
+
+def bench_wsgi(paths, token, requests, concurrency):
+    from django.test import Client
+
+    def fetch(path):
+        started = time.perf_counter()
+        response = Client().get(path, HTTP_AUTHORIZATION=f'Token {token}')
+        assert response.status_code == 200, (path, response.status_code)
+        return time.perf_counter() - started
+
+    work = list(itertools.islice(itertools.cycle(paths), requests))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(fetch, work))
+    return samples, time.perf_counter() - started
+
+
+def bench_asgi(paths, token, requests, concurrency):
+    from django.test import AsyncClient
+
+    async def worker(queue, samples):
+        client = AsyncClient()
+        while queue:
+            path = queue.pop()
+            started = time.perf_counter()
+            response = await client.get(path, headers={'Authorization': f'Token {token}'})
+            assert response.status_code == 200, (path, response.status_code)
+            samples.append(time.perf_counter() - started)
+
+    async def run():
+        queue = list(itertools.islice(itertools.cycle(paths), requests))
+        samples = []
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(queue, samples) for _ in range(concurrency)))
+        return samples, time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--products', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        token, paths = seed(args.products)
+        for label, bench in (('WSGI (threads)', bench_wsgi), ('ASGI (async views)', bench_asgi)):
+            bench(paths, token, len(paths), 1)  # Warm up
+            samples, elapsed = bench(paths, token, args.requests, args.concurrency)
+            print(format_row(label, summarize(samples)) + f' throughput={len(samples) / elapsed:8.1f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Checkout latency benchmark.
+
+Times POST /api/orders/create/ for carts with 1, 10 and 100 line items
+against a throwaway test database and reports latency and query counts:
+
+    python benchmarks/checkout.py --rounds 30
+"""
+import argparse
+import time
+from decimal import Decimal
+from support import format_row, setup_django, summarize, test_database
+
+
+def run(rounds, sizes):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from cart.models import Cart, CartItem
+    from store.models import Category, Product
+    from users.models import Address, CustomUser
+
+    category = Category.objects.create(name='Benchmark')
+    products = [
+        Product(name=f'Product {i}', description='Benchmark product', price=Decimal('9.99'),
+                category=category, stock_quantity=10 ** 6)
+        for i in range(max(sizes))
+    ]
+    products = Product.objects.bulk_create(products)
+
+    for size in sizes:
+        samples = []
+        queries = 0
+        for round_number in range(rounds):
+            user = CustomUser.objects.create(username=f'bench-{size}-{round_number}', email=f'bench-{size}-{round_number}@example.com')
+            address = Address.objects.create(
+                user=user, street_address='1 Bench St', city='Bench', state='BE',
+                postal_code='00000', country='US', is_default=True,
+            )
+            cart = Cart.objects.create(user=user)
+            CartItem.objects.bulk_create(CartItem(cart=cart, product=product, quantity=1) for product in products[:size])
+            client = APIClient()
+            client.force_authenticate(user)
+
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = client.post('/api/orders/create/', {
+                    'shipping_address_id': address.pk,
+                    'payment_method': 'credit_card',
+                }, format='json')
+                samples.append(time.perf_counter() - started)
+            assert response.status_code == 201, response.data
+            queries = len(context.captured_queries)
+
+        print(format_row(f'{size} line item(s)', summarize(samples)) + f' queries={queries}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100])
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.rounds, args.sizes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Concurrent read/write throughput per database profile.
+
+Reader threads fetch the product list and detail while writer threads add
+to their carts, for --seconds per profile. Every request is followed by
+close_old_connections(), as a server does at the end of a request, so
+CONN_MAX_AGE and the per-connection PRAGMAs cost what they cost in
+production. Compares, for the configured DB_ENGINE:
+
+    sqlite       Django's defaults (rollback journal, synchronous=FULL,
+                 deferred transactions) against the WAL profile
+    postgresql   a connection per request against the configured
+                 persistent connections (or pool)
+
+    python benchmarks/db_profiles.py --readers 8 --writers 4 --seconds 10
+    DB_ENGINE=postgresql POSTGRES_HOST=localhost python benchmarks/db_profiles.py
+
+SQLite runs against a throwaway database file, since the in-memory test
+database has no journal to tune. Errors are requests that failed with
+"database is locked" or a non-2xx status.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from support import format_row, setup_django, summarize, test_database
+
+
+def profiles(database):
+    from django.conf import settings
+
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        return [
+            ('rollback journal', {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, {'OPTIONS': {}}),
+            ('WAL', settings.SQLITE_PRAGMAS, {'OPTIONS': database['OPTIONS']}),
+        ]
+    return [
+        ('connection per request', {}, {'CONN_MAX_AGE': 0, 'OPTIONS': {}}),
+        ('persistent', {}, {'CONN_MAX_AGE': database['CONN_MAX_AGE'], 'OPTIONS': database.get('OPTIONS', {})}),
+    ]
+
+
+def seed(products, writers):
+    from store.models import Category, Product
+    from users.models import CustomUser
+    from users.tokens import issue_token
+
+    category = Category.objects.create(name='Benchmark')
+    products = Product.objects.bulk_create(
+        Product(name=f'Product {i}', description='Benchmark product', price=Decimal('9.99'),
+                category=category, stock_quantity=10 ** 9)
+        for i in range(products)
+    )
+    tokens = [
+        issue_token(CustomUser.objects.create(username=f'bench{i}', email=f'bench{i}@example.com')).key
+        for i in range(writers + 1)
+    ]
+    return [product.pk for product in products], tokens
+
+
+def run(product_ids, tokens, readers, writers, seconds):
+    from django.db import OperationalError, close_old_connections, connection
+    from django.test import Client
+
+    deadline = time.perf_counter() + seconds
+    samples = {'read': [], 'write': []}
+    errors = []
+    barrier = threading.Barrier(readers + writers)
+
+    def request(kind, send):
+        started = time.perf_counter()
+        try:
+            ok = 200 <= send().status_code < 300
+        except OperationalError:
+            ok = False
+        finally:
+            close_old_connections()
+        if ok:
+            samples[kind].append(time.perf_counter() - started)
+        else:
+            errors.append(kind)
+
+    def reader(worker):
+        client = Client(HTTP_AUTHORIZATION=f'Token {tokens[0]}')
+        paths = ['/api/store/products/', *(f'/api/store/products/{pk}/' for pk in product_ids[:20])]
+        try:
+            barrier.wait()
+            for i in range(worker, 10 ** 9):
+                if time.perf_counter() > deadline:
+                    break
+                request('read', lambda: client.get(paths[i % len(paths)]))
+        finally:
+            connection.close()
+
+    def writer(worker):
+        client = Client(HTTP_AUTHORIZATION=f'Token {tokens[worker + 1]}')
+        try:
+            barrier.wait()
+            for i in range(10 ** 9):
+                if time.perf_counter() > deadline:
+                    break
+                data = {'product_id': product_ids[(worker + i) % len(product_ids)], 'quantity': 1}
+                request('write', lambda: client.post('/api/cart/add/', data, content_type='application/json'))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--products', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    # Failed requests are counted below; their tracebacks would drown the report
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    database = connection.settings_dict
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+    # Rate limits would refuse most of the writes
+    with test_database(), override_settings(RATE_LIMITS={'RATES': {}}):
+        product_ids, tokens = seed(args.products, args.writers)
+        original = {key: database[key] for key in ('CONN_MAX_AGE', 'OPTIONS')}
+        for label, pragmas, overrides in profiles(dict(database)):
+            connection.close()
+            database.update(overrides)
+            try:
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    samples, errors = run(product_ids, tokens, args.readers, args.writers, args.seconds)
+            finally:
+                database.update(original)
+            for kind in ('read', 'write'):
+                if not samples[kind]:
+                    print(f'{label} {kind}s: no successful requests, errors={errors.count(kind)}')
+                    continue
+                print(
+                    format_row(f'{label} {kind}s', summarize(samples[kind]))
+                    + f' throughput={len(samples[kind]) / args.seconds:8.1f} req/s errors={errors.count(kind)}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Shared setup for the benchmark scripts in this directory."""
+import os
+import statistics
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_project.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database(keepdb=False):
+    """Run the block against a throwaway test database, like the test runner."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    ms = [sample * 1000 for sample in samples]
+    return {
+        'n': len(ms),
+        'mean': statistics.fmean(ms),
+        'p50': percentile(ms, 50),
+        'p95': percentile(ms, 95),
+        'p99': percentile(ms, 99),
+    }
+
+
+def format_row(label, summary):
+    return (
+        f"{label:<24} n={summary['n']:<5} mean={summary['mean']:8.2f}ms "
+        f"p50={summary['p50']:8.2f}ms p95={summary['p95']:8.2f}ms p99={summary['p99']:8.2f}ms"
+    )
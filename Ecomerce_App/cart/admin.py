@@ -1,22 +1,46 @@
 from django.contrib import admin
-from .models import Cart, CartItem
+from .models import Cart, CartItem, StockReservation
 
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
     readonly_fields = ('total_price',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ('user', 'total_items', 'total_price', 'created_at')
-    search_fields = ('user__username',)
+    list_display = ('__str__', 'total_items', 'total_price', 'created_at')
+    list_filter = (('user', admin.EmptyFieldListFilter),)
+    search_fields = ('user__username', 'guest_token')
     ordering = ('-updated_at',)
     inlines = [CartItemInline]
     readonly_fields = ('total_items', 'total_price')
 
+    def get_queryset(self, request):
+        # Totals for the whole changelist page come from one aggregate query
+        return super().get_queryset(request).select_related('user').with_totals()
+
+    @admin.display(description='Total items', ordering='annotated_total_items')
+    def total_items(self, obj):
+        return obj.total_items
+
+    @admin.display(description='Total price', ordering='annotated_total_price')
+    def total_price(self, obj):
+        return obj.total_price
+
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('cart', 'product', 'quantity', 'total_price', 'added_at')
     list_filter = ('added_at',)
     search_fields = ('cart__user__username', 'product__name')
     ordering = ('-added_at',)
+    list_select_related = ('cart__user', 'product')
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('cart', 'product', 'quantity', 'expires_at')
+    list_filter = ('expires_at',)
+    search_fields = ('cart__user__username', 'product__name')
+    ordering = ('expires_at',)
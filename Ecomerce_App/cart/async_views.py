@@ -0,0 +1,21 @@
+"""Async cart read (see ecommerce_project/asyncapi.py)."""
+from django.utils import timezone
+from ecommerce_project.asyncapi import Fallback, async_read_view, json_response
+from . import views
+from .guest import guest_token_from
+from .models import Cart
+from .serializers import CartSerializer
+
+
+@async_read_view(views.CartView.as_view(), allow='GET, HEAD, OPTIONS')
+async def cart_detail(request):
+    carts = Cart.objects.for_detail()
+    if request.user.is_authenticated:
+        cart, created = await carts.aget_or_create(user=request.user)
+    else:
+        token = guest_token_from(request)
+        cart = await carts.filter(guest_token=token).afirst() if token else None
+        if cart is None:
+            raise Fallback
+        await Cart.objects.filter(pk=cart.pk).aupdate(updated_at=timezone.now())
+    return json_response(CartSerializer(cart, context={'request': request}).data)
@@ -0,0 +1,107 @@
+from django.db import transaction
+from store.inventory import InsufficientStock
+from store.models import Product
+from .models import CartItem
+from .reservations import hold, release, with_available
+
+
+class UnknownCartLines(Exception):
+    """Operations referenced cart items or products that do not exist."""
+
+    def __init__(self, item_ids=(), product_ids=()):
+        self.item_ids = sorted(item_ids)
+        self.product_ids = sorted(product_ids)
+        super().__init__(f'items {self.item_ids}, products {self.product_ids}')
+
+
+def resolve_quantities(current, items_by_id, operations):
+    """
+    Fold the operations, in order, over {product_id: quantity} and return
+    the final quantities (0 meaning the line is removed).
+    """
+    quantities = dict(current)
+    missing_items = set()
+    for operation in operations:
+        product_id = operation.get('product_id')
+        if 'item_id' in operation:
+            product_id = items_by_id.get(operation['item_id'])
+            if product_id is None:
+                missing_items.add(operation['item_id'])
+                continue
+
+        if operation['op'] == 'add':
+            quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+        elif operation['op'] == 'update':
+            quantities[product_id] = operation['quantity']
+        else:
+            quantities[product_id] = 0
+
+    if missing_items:
+        raise UnknownCartLines(item_ids=missing_items)
+    return quantities
+
+
+def apply_operations(cart, operations):
+    """
+    Apply a list of add/update/remove operations to cart atomically.
+
+    The existing lines are read once, the operations are folded into final
+    quantities, stock for every increased line is checked with a single
+    locked product query (net of other carts' reservations) and the changes
+    go out as one bulk insert, one bulk update, one delete and one
+    reservation upsert. Nothing is written if any line is short.
+    """
+    with transaction.atomic():
+        items = {item.product_id: item for item in cart.items.all()}
+        current = {product_id: item.quantity for product_id, item in items.items()}
+        final = resolve_quantities(current, {item.pk: product_id for product_id, item in items.items()}, operations)
+        increased = {
+            product_id: quantity for product_id, quantity in final.items()
+            if quantity > current.get(product_id, 0)
+        }
+
+        products = {
+            product.pk: product
+            for product in with_available(
+                Product.objects.select_for_update().filter(pk__in=increased, is_active=True), exclude_cart=cart,
+            )
+        }
+        if increased.keys() - products.keys():
+            raise UnknownCartLines(product_ids=increased.keys() - products.keys())
+        shortages = [
+            {
+                'product_id': product_id,
+                'name': products[product_id].name,
+                'requested': quantity,
+                'available': max(products[product_id].available, 0),
+            }
+            for product_id, quantity in sorted(increased.items())
+            if products[product_id].available < quantity
+        ]
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        removed = [product_id for product_id, quantity in final.items() if quantity == 0 and product_id in items]
+        changed = []
+        for product_id, quantity in final.items():
+            item = items.get(product_id)
+            if item is not None and quantity and quantity != item.quantity:
+                item.quantity = quantity
+                changed.append(item)
+        created = [
+            CartItem(cart=cart, product_id=product_id, quantity=quantity)
+            for product_id, quantity in final.items()
+            if quantity and product_id not in items
+        ]
+
+        if created:
+            CartItem.objects.bulk_create(created)
+        if changed:
+            CartItem.objects.bulk_update(changed, ['quantity'])
+        if removed:
+            CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+            release(cart, removed)
+        hold(cart, {
+            product_id: quantity for product_id, quantity in final.items()
+            if quantity and quantity != current.get(product_id)
+        })
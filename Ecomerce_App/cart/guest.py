@@ -0,0 +1,109 @@
+"""
+Server-side carts for anonymous shoppers.
+
+A guest cart is an ordinary Cart row with no user and an opaque
+guest_token; its lines, reservations and totals use the same tables and
+code paths as signed-in carts. The first cart mutation from an anonymous
+client creates the cart and returns the token in the X-Cart-Token response
+header; the client echoes it back in the X-Cart-Token request header. On
+login the guest cart is merged into the user's cart, and untouched guest
+carts are removed by the `purge_guest_carts` management command.
+"""
+import secrets
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.http import Http404
+from django.utils import timezone
+from .models import Cart, CartItem, StockReservation
+from .reservations import hold
+
+GUEST_CART_HEADER = 'X-Cart-Token'
+DEFAULT_TTL_DAYS = 7
+
+
+def guest_token_from(request):
+    return request.META.get('HTTP_X_CART_TOKEN', '').strip() or None
+
+
+def get_request_cart(request, create=False, queryset=None):
+    """
+    The cart of the signed-in user or of the X-Cart-Token guest.
+
+    With create=True a missing cart is created (a new guest token is issued
+    to anonymous clients); otherwise Http404 is raised.
+    """
+    queryset = queryset if queryset is not None else Cart.objects.all()
+    if request.user.is_authenticated:
+        if create:
+            return queryset.get_or_create(user=request.user)[0]
+        try:
+            return queryset.get(user=request.user)
+        except Cart.DoesNotExist:
+            raise Http404('Cart not found')
+
+    token = guest_token_from(request)
+    if token:
+        cart = queryset.filter(guest_token=token).first()
+        if cart is not None:
+            # Keep active guest carts away from the TTL sweep
+            Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+            return cart
+    if not create:
+        raise Http404('Cart not found')
+    return queryset.create(guest_token=secrets.token_urlsafe(16))
+
+
+def with_cart_token(response, cart):
+    """Hand the guest token back to the client."""
+    if cart.guest_token:
+        response[GUEST_CART_HEADER] = cart.guest_token
+    return response
+
+
+def merge_guest_cart(token, user):
+    """
+    Move the lines and holds of the guest cart `token` into user's cart.
+
+    Lines for products the user has no line for are re-parented with one
+    UPDATE; overlapping lines have their quantities summed with one bulk
+    update and their holds combined with one upsert. The guest cart is then
+    deleted. Returns the user's cart, or None if there was nothing to merge.
+    """
+    if not token:
+        return None
+    with transaction.atomic():
+        guest = Cart.objects.select_for_update().filter(guest_token=token).first()
+        if guest is None:
+            return None
+        cart, created = Cart.objects.get_or_create(user=user)
+
+        existing = {item.product_id: item for item in cart.items.all()}
+        overlapping = []
+        for item in guest.items.filter(product_id__in=existing):
+            line = existing[item.product_id]
+            line.quantity += item.quantity
+            overlapping.append(line)
+
+        guest.items.exclude(product_id__in=existing).update(cart=cart)
+        guest.reservations.exclude(product_id__in=existing).update(cart=cart)
+        if overlapping:
+            CartItem.objects.bulk_update(overlapping, ['quantity'])
+            held = dict(
+                StockReservation.objects.filter(
+                    cart__in=(cart, guest), product_id__in=existing,
+                ).values_list('product_id').annotate(total=Sum('quantity'))
+            )
+            hold(cart, held)
+        guest.delete()
+    return cart
+
+
+def guest_cart_ttl():
+    return timedelta(days=getattr(settings, 'GUEST_CART_TTL_DAYS', DEFAULT_TTL_DAYS))
+
+
+def stale_guest_carts(cutoff):
+    """Guest carts untouched since `cutoff`."""
+    return Cart.objects.filter(user__isnull=True, updated_at__lt=cutoff)
@@ -0,0 +1,33 @@
+from django.utils import timezone
+from ecommerce_project.hot_queries import hot_query
+from .guest import stale_guest_carts as stale_guest_carts_before
+from .models import Cart, items_prefetch
+from store.models import Product
+from .reservations import expired_reservations as expired_reservations_at, with_available
+
+
+@hot_query('cart-items')
+def cart_items():
+    return items_prefetch().queryset.filter(cart_id__in=[1])
+
+
+@hot_query('guest-cart')
+def guest_cart():
+    # get_request_cart() for an X-Cart-Token
+    return Cart.objects.filter(guest_token='token')
+
+
+@hot_query('available-to-sell')
+def available_to_sell():
+    # reserve() and batch updates, without the row locks
+    return with_available(Product.objects.filter(pk__in=[1, 2, 3], is_active=True), exclude_cart=1)
+
+
+@hot_query('expired-reservations')
+def expired_reservations():
+    return expired_reservations_at(timezone.now()).values_list('pk', flat=True)[:1000]
+
+
+@hot_query('stale-guest-carts')
+def stale_guest_carts():
+    return stale_guest_carts_before(timezone.now()).values_list('pk', flat=True)[:1000]
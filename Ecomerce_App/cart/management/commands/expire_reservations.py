@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from cart.reservations import expired_reservations
+from ecommerce_project.purge import delete_in_batches
+
+class Command(BaseCommand):
+    help = 'Release stock reservations whose hold has expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of reservations to delete per statement',
+        )
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep sweeping every N seconds instead of exiting after one pass',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expired = delete_in_batches(expired_reservations(timezone.now()), options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Expired {expired} reservations'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
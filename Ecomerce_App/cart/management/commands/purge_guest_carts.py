@@ -0,0 +1,23 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from cart.guest import guest_cart_ttl, stale_guest_carts
+from ecommerce_project.purge import delete_in_batches
+
+class Command(BaseCommand):
+    help = 'Delete guest carts that have not been used within the TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Override GUEST_CART_TTL_DAYS',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of carts to delete per statement',
+        )
+
+    def handle(self, *args, **options):
+        ttl = timedelta(days=options['days']) if options['days'] is not None else guest_cart_ttl()
+        purged = delete_in_batches(stale_guest_carts(timezone.now() - ttl), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} guest carts'))
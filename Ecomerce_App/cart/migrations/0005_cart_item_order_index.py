@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0004_guest_carts'),
+        ('store', '0007_hot_path_indexes_and_checks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'added_at', 'id'], name='cartitem_cart_added_idx'),
+        ),
+    ]
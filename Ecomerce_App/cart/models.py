@@ -1,22 +1,84 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import DecimalField, F, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce
 from users.models import CustomUser
 from store.models import Product
 
+PRICE_TOTAL = DecimalField(max_digits=12, decimal_places=2)
+CENTS = Decimal('0.01')
+
+
+def items_prefetch():
+    """Cart lines in the order they were added, with products and categories."""
+    return Prefetch('items', CartItem.objects.select_related('product__category').order_by('added_at', 'id'))
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate item count and price total, aggregated in the database."""
+        return self.annotate(
+            annotated_total_items=Coalesce(Sum('items__quantity'), Value(0)),
+            annotated_total_price=Coalesce(
+                Sum(F('items__quantity') * F('items__product__price'), output_field=PRICE_TOTAL),
+                Value(Decimal('0.00')), output_field=PRICE_TOTAL,
+            ),
+        )
+
+    def for_detail(self):
+        """Load the items with their products and categories in one extra query."""
+        return self.prefetch_related(items_prefetch())
+
+
 class Cart(models.Model):
-    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='cart')
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='cart', null=True, blank=True)
+    # Anonymous carts are keyed by an opaque token sent in X-Cart-Token
+    guest_token = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(user__isnull=False, guest_token__isnull=True)
+                | models.Q(user__isnull=True, guest_token__isnull=False),
+                name='cart_owner_xor_guest_token',
+            ),
+        ]
+        indexes = [
+            # Guest cart cleanup scans by age
+            models.Index(fields=['updated_at'], name='cart_updated_idx', condition=models.Q(user__isnull=True)),
+        ]
+
     def __str__(self):
+        if self.user_id is None:
+            return f"Guest cart {self.guest_token}"
         return f"Cart for {self.user.username}"
 
+    def _items_loaded(self):
+        return 'items' in getattr(self, '_prefetched_objects_cache', {})
+
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        # Annotated (with_totals) or prefetched (for_detail) carts need no
+        # extra query; otherwise aggregate in the database.
+        if hasattr(self, 'annotated_total_items'):
+            return self.annotated_total_items
+        if self._items_loaded():
+            return sum(item.quantity for item in self.items.all())
+        return Cart.objects.filter(pk=self.pk).with_totals().values_list('annotated_total_items', flat=True).get()
 
     @property
     def total_price(self):
-        return sum(item.total_price for item in self.items.all())
+        if hasattr(self, 'annotated_total_price'):
+            # SQLite returns computed decimals unscaled
+            return self.annotated_total_price.quantize(CENTS)
+        if self._items_loaded():
+            return sum((item.total_price for item in self.items.all()), Decimal('0.00'))
+        total = Cart.objects.filter(pk=self.pk).with_totals().values_list('annotated_total_price', flat=True).get()
+        return total.quantize(CENTS)
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -26,6 +88,10 @@ class CartItem(models.Model):
 
     class Meta:
         unique_together = ('cart', 'product')
+        indexes = [
+            # A cart's lines in the order they were added (CartQuerySet.for_detail)
+            models.Index(fields=['cart', 'added_at', 'id'], name='cartitem_cart_added_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
@@ -33,3 +99,22 @@ class CartItem(models.Model):
     @property
     def total_price(self):
         return self.product.price * self.quantity
+
+class StockReservation(models.Model):
+    """Units of a product held for a cart until expires_at."""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('cart', 'product')
+        indexes = [
+            # Covers the active-holds sum per product and the expiry sweep
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_exp_idx'),
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} x {self.quantity} held for {self.cart}"
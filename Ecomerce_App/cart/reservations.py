@@ -0,0 +1,101 @@
+"""
+Stock reservations held by carts.
+
+Adding or updating a cart line holds the line's quantity for
+CART_RESERVATION_TTL seconds (refreshed on every change). Units held by
+other carts are not available to sell, so shoppers who got an item into
+their cart can check out even while a flash sale drains the stock.
+Holds are released when the line is removed or the cart cleared,
+consumed by checkout, and swept after expiry by the
+`expire_reservations` management command.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from store.inventory import InsufficientStock
+from store.models import Product
+from .models import StockReservation
+
+DEFAULT_TTL = 15 * 60
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'CART_RESERVATION_TTL', DEFAULT_TTL))
+
+
+def held_quantity(exclude_cart=None, now=None):
+    """
+    Per-product expression for the units held by active reservations,
+    optionally ignoring the holds of one cart. The correlated sum is served
+    by the (product, expires_at) index.
+    """
+    reservations = StockReservation.objects.filter(
+        product=OuterRef('pk'), expires_at__gt=now or timezone.now(),
+    )
+    if exclude_cart is not None:
+        reservations = reservations.exclude(cart=exclude_cart)
+    total = reservations.order_by().values('product').annotate(total=Sum('quantity')).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def with_available(products, exclude_cart=None):
+    """Annotate `products` with `available`: stock minus the units held by other carts."""
+    return products.annotate(available=F('stock_quantity') - held_quantity(exclude_cart))
+
+
+def reserve(cart, product, quantity):
+    """
+    Hold `quantity` units of product for cart (replacing any previous hold)
+    or raise InsufficientStock. The product row is locked while checking so
+    two carts cannot both claim the last units.
+    """
+    with transaction.atomic():
+        units = with_available(
+            Product.objects.select_for_update().filter(pk=product.pk, is_active=True), exclude_cart=cart,
+        ).values_list('available', flat=True).first()
+        available = max(units or 0, 0)
+        if available < quantity:
+            raise InsufficientStock([{
+                'product_id': product.pk,
+                'name': product.name,
+                'requested': quantity,
+                'available': available,
+            }])
+        StockReservation.objects.update_or_create(
+            cart=cart, product=product,
+            defaults={'quantity': quantity, 'expires_at': timezone.now() + reservation_ttl()},
+        )
+
+
+def hold(cart, quantities):
+    """
+    Set the cart's holds to {product_id: quantity} with one upsert. Callers
+    are responsible for having checked availability under a row lock.
+    """
+    if not quantities:
+        return
+    expires_at = timezone.now() + reservation_ttl()
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(cart=cart, product_id=product_id, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['cart', 'product'],
+        update_fields=['quantity', 'expires_at'],
+    )
+
+
+def release(cart, product_ids=None):
+    """Drop the cart's holds, on every product or only the given ones."""
+    reservations = StockReservation.objects.filter(cart=cart)
+    if product_ids is not None:
+        reservations = reservations.filter(product_id__in=product_ids)
+    return reservations.delete()[0]
+
+
+def expired_reservations(now):
+    return StockReservation.objects.filter(expires_at__lte=now)
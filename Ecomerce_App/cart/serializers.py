@@ -35,3 +35,23 @@ class UpdateCartItemSerializer(serializers.ModelSerializer):
         if value <= 0:
             raise serializers.ValidationError("Quantity must be greater than 0")
         return value
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=('add', 'update', 'remove'))
+    product_id = serializers.IntegerField(required=False)
+    item_id = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if ('product_id' in attrs) == ('item_id' in attrs):
+            raise serializers.ValidationError("Give exactly one of product_id or item_id")
+        if attrs['op'] == 'add' and 'product_id' not in attrs:
+            raise serializers.ValidationError("add operations need a product_id")
+        if attrs['op'] == 'add':
+            attrs.setdefault('quantity', 1)
+        elif attrs['op'] == 'update' and 'quantity' not in attrs:
+            raise serializers.ValidationError("update operations need a quantity")
+        return attrs
+
+class BatchCartSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
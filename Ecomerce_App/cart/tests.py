@@ -1,3 +1,299 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from store.models import Category, Product
+from users.models import Address, CustomUser
+from users.tokens import issue_token
+from .models import Cart, CartItem, StockReservation
 
-# Create your tests here.
+
+class CartTestCase(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Books')
+        self.product = Product.objects.create(
+            name='Clean Code', description='Clean Code', price=Decimal('10.00'),
+            category=self.category, stock_quantity=3,
+        )
+        self.user, self.client = self.make_shopper('buyer')
+
+    def make_shopper(self, username):
+        user = CustomUser.objects.create(username=username, email=f'{username}@example.com')
+        client = APIClient()
+        client.force_authenticate(user)
+        return user, client
+
+    def add(self, client, quantity, product=None):
+        return client.post('/api/cart/add/', {
+            'product_id': (product or self.product).pk, 'quantity': quantity,
+        }, format='json')
+
+
+class StockReservationTests(CartTestCase):
+    def test_add_holds_stock_from_other_carts(self):
+        self.assertEqual(self.add(self.client, 2).status_code, 201)
+
+        other, other_client = self.make_shopper('other')
+        response = self.add(other_client, 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['shortages'][0]['available'], 1)
+        self.assertEqual(self.add(other_client, 1).status_code, 201)
+
+    def test_update_replaces_hold(self):
+        self.add(self.client, 1)
+        item = CartItem.objects.get(cart__user=self.user)
+
+        response = self.client.put(f'/api/cart/items/{item.pk}/update/', {'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StockReservation.objects.get().quantity, 3)
+
+        response = self.client.put(f'/api/cart/items/{item.pk}/update/', {'quantity': 4}, format='json')
+        self.assertEqual(response.status_code, 400)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 3)
+
+    def test_remove_and_clear_release_holds(self):
+        self.add(self.client, 2)
+        item = CartItem.objects.get(cart__user=self.user)
+        self.client.delete(f'/api/cart/items/{item.pk}/remove/')
+        self.assertFalse(StockReservation.objects.exists())
+
+        self.add(self.client, 2)
+        self.client.delete('/api/cart/clear/')
+        self.assertFalse(StockReservation.objects.exists())
+        other, other_client = self.make_shopper('other')
+        self.assertEqual(self.add(other_client, 3).status_code, 201)
+
+    def test_expired_holds_do_not_count_and_are_swept(self):
+        self.add(self.client, 3)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        other, other_client = self.make_shopper('other')
+        self.assertEqual(self.add(other_client, 3).status_code, 201)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command('expire_reservations', batch_size=1, stdout=out)
+        self.assertIn('Expired 2 reservations', out.getvalue())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_consumes_own_hold_but_not_others(self):
+        address = Address.objects.create(
+            user=self.user, street_address='1 Main St', city='Springfield',
+            state='IL', postal_code='62701', country='US', is_default=True,
+        )
+        self.add(self.client, 1)
+        other, other_client = self.make_shopper('other')
+        self.add(other_client, 2)
+
+        # Sneak a line past the reservation check; checkout must still
+        # refuse to take units held by the other cart.
+        CartItem.objects.filter(cart__user=self.user).update(quantity=2)
+        checkout = {'shipping_address_id': address.pk, 'payment_method': 'credit_card'}
+        response = self.client.post('/api/orders/create/', checkout, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['shortages'][0]['available'], 1)
+
+        CartItem.objects.filter(cart__user=self.user).update(quantity=1)
+        response = self.client.post('/api/orders/create/', checkout, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 2)
+        self.assertEqual(list(StockReservation.objects.values_list('cart__user__username', flat=True)), ['other'])
+
+
+class BatchCartTests(CartTestCase):
+    def batch(self, *operations):
+        return self.client.post('/api/cart/batch/', {'operations': list(operations)}, format='json')
+
+    def make_products(self, count):
+        return [
+            Product.objects.create(
+                name=f'Book {i}', description='Book', price=Decimal('5.00'),
+                category=self.category, stock_quantity=10,
+            )
+            for i in range(count)
+        ]
+
+    def test_applies_operations_in_order(self):
+        other = self.make_products(1)[0]
+        self.add(self.client, 1)
+        item = CartItem.objects.get(cart__user=self.user)
+
+        response = self.batch(
+            {'op': 'add', 'product_id': other.pk, 'quantity': 2},
+            {'op': 'add', 'product_id': other.pk},
+            {'op': 'update', 'item_id': item.pk, 'quantity': 3},
+            {'op': 'remove', 'product_id': self.product.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = {line['product']['id']: line['quantity'] for line in response.data['cart']['items']}
+        self.assertEqual(lines, {other.pk: 3})
+        self.assertEqual(
+            dict(StockReservation.objects.values_list('product_id', 'quantity')), {other.pk: 3},
+        )
+
+    def test_shortage_writes_nothing(self):
+        other = self.make_products(1)[0]
+        response = self.batch(
+            {'op': 'add', 'product_id': other.pk, 'quantity': 2},
+            {'op': 'add', 'product_id': self.product.pk, 'quantity': 4},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([s['product_id'] for s in response.data['shortages']], [self.product.pk])
+        self.assertFalse(CartItem.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_unknown_lines_are_rejected(self):
+        other_user, other_client = self.make_shopper('other')
+        self.add(other_client, 1)
+        foreign_item = CartItem.objects.get(cart__user=other_user)
+
+        response = self.batch({'op': 'remove', 'item_id': foreign_item.pk})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['item_ids'], [foreign_item.pk])
+        self.assertEqual(self.batch({'op': 'add', 'product_id': 0}).status_code, 404)
+        self.assertEqual(self.batch({'op': 'update', 'product_id': self.product.pk}).status_code, 400)
+
+    def test_query_count_does_not_grow_with_operations(self):
+        products = self.make_products(20)
+        Cart.objects.create(user=self.user)
+        counts = []
+        for size in (1, 20):
+            operations = [{'op': 'add', 'product_id': p.pk, 'quantity': 1} for p in products[:size]]
+            self.client.delete('/api/cart/clear/')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.batch(*operations)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class CartTotalsTests(CartTestCase):
+    def fill(self, user, count):
+        cart, created = Cart.objects.get_or_create(user=user)
+        for i in range(count):
+            product = Product.objects.create(
+                name=f'{user.username} {i}', description='Book', price=Decimal('2.50'),
+                category=self.category, stock_quantity=10,
+            )
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+        return cart
+
+    def test_totals_agree_across_loading_strategies(self):
+        cart = self.fill(self.user, 3)
+        annotated = Cart.objects.with_totals().get(pk=cart.pk)
+        prefetched = Cart.objects.for_detail().get(pk=cart.pk)
+        plain = Cart.objects.get(pk=cart.pk)
+        for loaded in (annotated, prefetched, plain):
+            self.assertEqual(loaded.total_items, 6)
+            self.assertEqual(loaded.total_price, Decimal('15.00'))
+        empty, created = Cart.objects.get_or_create(user=self.make_shopper('empty')[0])
+        self.assertEqual(Cart.objects.with_totals().get(pk=empty.pk).total_price, Decimal('0.00'))
+
+    def test_cart_view_queries_do_not_grow_with_items(self):
+        self.fill(self.user, 1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/cart/')
+        self.fill(self.user, 10)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/api/cart/')
+        self.assertEqual(response.data['total_items'], 22)
+        self.assertEqual(len(small), len(large))
+
+    def test_admin_changelist_queries_do_not_grow_with_carts(self):
+        admin = CustomUser.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+        self.fill(self.user, 3)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get('/admin/cart/cart/').status_code, 200)
+        for i in range(5):
+            self.fill(self.make_shopper(f'shopper{i}')[0], 3)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.client.get('/admin/cart/cart/').status_code, 200)
+        self.assertEqual(len(small), len(large))
+        cart = Cart.objects.get(user=self.user)
+        response = self.client.get(f'/admin/cart/cart/{cart.pk}/change/')
+        self.assertContains(response, '15.00')
+
+
+class GuestCartTests(CartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.guest = APIClient()
+
+    def guest_add(self, quantity, product=None, token=None):
+        headers = {'HTTP_X_CART_TOKEN': token} if token else {}
+        return self.guest.post('/api/cart/add/', {
+            'product_id': (product or self.product).pk, 'quantity': quantity,
+        }, format='json', **headers)
+
+    def test_guest_cart_is_keyed_by_token(self):
+        self.assertEqual(self.guest.get('/api/cart/').status_code, 404)
+
+        response = self.guest_add(1)
+        self.assertEqual(response.status_code, 201)
+        token = response['X-Cart-Token']
+        self.assertEqual(self.guest_add(1, token=token)['X-Cart-Token'], token)
+
+        response = self.guest.get('/api/cart/', HTTP_X_CART_TOKEN=token)
+        self.assertEqual(response.data['total_items'], 2)
+        self.assertEqual(StockReservation.objects.get(cart__guest_token=token).quantity, 2)
+        # Another client's token never reaches this cart
+        self.assertEqual(self.guest.get('/api/cart/', HTTP_X_CART_TOKEN='nope').status_code, 404)
+
+    def test_login_merges_guest_cart(self):
+        other = Product.objects.create(
+            name='Refactoring', description='Refactoring', price=Decimal('10.00'),
+            category=self.category, stock_quantity=5,
+        )
+        self.user.set_password('secret')
+        self.user.save()
+        self.add(self.client, 1)
+        token = self.guest_add(1)['X-Cart-Token']
+        self.guest_add(2, product=other, token=token)
+
+        response = self.guest.post('/api/auth/login/', {
+            'username': 'buyer', 'password': 'secret',
+        }, format='json', HTTP_X_CART_TOKEN=token)
+        self.assertEqual(response.status_code, 200)
+
+        cart = Cart.objects.get(user=self.user)
+        self.assertEqual(dict(cart.items.values_list('product_id', 'quantity')), {self.product.pk: 2, other.pk: 2})
+        self.assertEqual(
+            dict(cart.reservations.values_list('product_id', 'quantity')), {self.product.pk: 2, other.pk: 2},
+        )
+        self.assertFalse(Cart.objects.filter(guest_token=token).exists())
+
+    def test_purge_removes_stale_guest_carts_only(self):
+        token = self.guest_add(1)['X-Cart-Token']
+        self.add(self.client, 1)
+        Cart.objects.update(updated_at=timezone.now() - timedelta(days=30))
+
+        call_command('purge_guest_carts', days=7, stdout=StringIO())
+        self.assertFalse(Cart.objects.filter(guest_token=token).exists())
+        self.assertTrue(Cart.objects.filter(user=self.user).exists())
+        self.assertFalse(StockReservation.objects.filter(cart__user__isnull=True).exists())
+
+
+class AsyncCartTests(CartTestCase):
+    async def test_async_cart_matches_sync_view(self):
+        token = await sync_to_async(issue_token)(self.user)
+        await sync_to_async(self.add)(self.client, 2)
+        guest = await sync_to_async(self.add)(APIClient(), 1)
+
+        for headers in ({'Authorization': f'Token {token.key}'}, {'X-Cart-Token': guest['X-Cart-Token']}, {}):
+            with self.subTest(headers=headers):
+                sync_response = await sync_to_async(APIClient().get)('/api/cart/', headers=headers)
+                async_response = await AsyncClient().get('/api/cart/', headers=headers)
+                self.assertEqual(async_response.status_code, sync_response.status_code)
+                # Reading a guest cart touches updated_at
+                async_data, sync_data = async_response.json(), sync_response.json()
+                async_data.pop('updated_at', None)
+                sync_data.pop('updated_at', None)
+                self.assertEqual(async_data, sync_data)
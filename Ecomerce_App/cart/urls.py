@@ -9,4 +9,5 @@ urlpatterns = [
     path('items/<int:item_id>/update/', views.update_cart_item, name='update-cart-item'),
     path('items/<int:item_id>/remove/', views.remove_from_cart, name='remove-from-cart'),
     path('clear/', views.clear_cart, name='clear-cart'),
+    path('batch/', views.batch_update_cart, name='batch-update-cart'),
 ]
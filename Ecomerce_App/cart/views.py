@@ -1,26 +1,36 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from idempotency.decorators import idempotent
+from .batch import UnknownCartLines, apply_operations
+from .guest import get_request_cart, with_cart_token
 from .models import Cart, CartItem
+from .reservations import release, reserve
+from store.inventory import InsufficientStock
 from store.models import Product
 from .serializers import (
     CartSerializer, 
     CartItemSerializer, 
     AddToCartSerializer, 
-    UpdateCartItemSerializer
+    UpdateCartItemSerializer,
+    BatchCartSerializer
 )
 
 class CartView(generics.RetrieveAPIView):
     serializer_class = CartSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.AllowAny]
 
     def get_object(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+        # Signed-in users always get a cart; guests only once they have one
+        return get_request_cart(
+            self.request, create=self.request.user.is_authenticated, queryset=Cart.objects.for_detail(),
+        )
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
+@idempotent
 def add_to_cart(request):
     serializer = AddToCartSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -29,66 +39,106 @@ def add_to_cart(request):
     quantity = serializer.validated_data['quantity']
     
     product = get_object_or_404(Product, id=product_id, is_active=True)
+    cart = get_request_cart(request, create=True)
     
-    if product.stock_quantity < quantity:
-        return Response({
-            'error': 'Insufficient stock'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart, 
-        product=product,
-        defaults={'quantity': quantity}
-    )
+    try:
+        with transaction.atomic():
+            cart_item, created = CartItem.objects.get_or_create(
+                cart=cart, 
+                product=product,
+                defaults={'quantity': quantity}
+            )
+            if not created:
+                cart_item.quantity += quantity
+                cart_item.save()
+            reserve(cart, product, cart_item.quantity)
+    except InsufficientStock as e:
+        return with_cart_token(Response({
+            'error': 'Insufficient stock',
+            'shortages': e.shortages
+        }, status=status.HTTP_400_BAD_REQUEST), cart)
     
-    if not created:
-        cart_item.quantity += quantity
-        if cart_item.quantity > product.stock_quantity:
-            return Response({
-                'error': 'Insufficient stock'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        cart_item.save()
-    
-    return Response({
+    return with_cart_token(Response({
         'message': 'Product added to cart successfully',
         'cart_item': CartItemSerializer(cart_item).data
-    }, status=status.HTTP_201_CREATED)
+    }, status=status.HTTP_201_CREATED), cart)
 
 @api_view(['PUT'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
+@idempotent
 def update_cart_item(request, item_id):
-    cart_item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
+    cart = get_request_cart(request)
+    cart_item = get_object_or_404(CartItem.objects.select_related('product'), id=item_id, cart=cart)
     serializer = UpdateCartItemSerializer(cart_item, data=request.data)
     serializer.is_valid(raise_exception=True)
     
     quantity = serializer.validated_data['quantity']
     
-    if cart_item.product.stock_quantity < quantity:
+    try:
+        with transaction.atomic():
+            serializer.save()
+            reserve(cart, cart_item.product, quantity)
+    except InsufficientStock as e:
         return Response({
-            'error': 'Insufficient stock'
+            'error': 'Insufficient stock',
+            'shortages': e.shortages
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    serializer.save()
     return Response({
         'message': 'Cart item updated successfully',
         'cart_item': CartItemSerializer(cart_item).data
     })
 
 @api_view(['DELETE'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
+@idempotent
 def remove_from_cart(request, item_id):
-    cart_item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
-    cart_item.delete()
+    cart = get_request_cart(request)
+    cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+    with transaction.atomic():
+        cart_item.delete()
+        release(cart, [cart_item.product_id])
     return Response({
         'message': 'Item removed from cart successfully'
     }, status=status.HTTP_204_NO_CONTENT)
 
 @api_view(['DELETE'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
+@idempotent
 def clear_cart(request):
-    cart = get_object_or_404(Cart, user=request.user)
-    cart.items.all().delete()
+    cart = get_request_cart(request)
+    with transaction.atomic():
+        cart.items.all().delete()
+        release(cart)
     return Response({
         'message': 'Cart cleared successfully'
     }, status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+@idempotent
+def batch_update_cart(request):
+    serializer = BatchCartSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    cart = get_request_cart(request, create=True)
+    
+    try:
+        apply_operations(cart, serializer.validated_data['operations'])
+    except UnknownCartLines as e:
+        return with_cart_token(Response({
+            'error': 'Cart item or product not found',
+            'item_ids': e.item_ids,
+            'product_ids': e.product_ids
+        }, status=status.HTTP_404_NOT_FOUND), cart)
+    except InsufficientStock as e:
+        return with_cart_token(Response({
+            'error': 'Insufficient stock',
+            'shortages': e.shortages
+        }, status=status.HTTP_400_BAD_REQUEST), cart)
+    
+    cart = Cart.objects.for_detail().get(pk=cart.pk)
+    return with_cart_token(Response({
+        'message': 'Cart updated successfully',
+        'cart': CartSerializer(cart).data
+    }), cart)
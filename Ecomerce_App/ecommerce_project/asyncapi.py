@@ -0,0 +1,154 @@
+"""
+Native async read endpoints for the ASGI entry point.
+
+Under ASGI, AsyncURLConfMiddleware routes requests through ASYNC_URLCONF,
+which maps the hot read endpoints (product list/detail, featured, search,
+cart, order list) to async views using Django's async ORM and falls
+through to the regular URLconf for everything else. WSGI deployments are
+unaffected.
+
+An async view only handles the common case: a JSON GET or HEAD. Anything
+else, such as writes, the browsable API, streaming, or input the DRF view
+would reject, raises Fallback, and the request is answered by the regular
+DRF view through sync_to_async. Responses and error payloads therefore
+stay identical between the two paths.
+"""
+import json
+import math
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from users.authentication import aauthenticate_token
+
+
+class Fallback(Exception):
+    """Let the sync DRF view answer this request."""
+
+
+class AsyncURLConfMiddleware:
+    """Serve ASGI requests from settings.ASYNC_URLCONF."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, 'ASYNC_URLCONF', None)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = self.urlconf
+        return await self.get_response(request)
+
+
+def wants_json(request):
+    """True unless DRF would pick another renderer (e.g. the browsable API)."""
+    format = request.GET.get('format')
+    if format:
+        return format == 'json'
+    return 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+
+
+def json_response(data, status=200):
+    """Render like DRF's JSONRenderer (compact, UTF-8)."""
+    content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return HttpResponse(content, status=status, content_type='application/json')
+
+
+def drf_request(request):
+    """Wrap the request for DRF filters and paginators (GET only, no parsing)."""
+    return Request(request)
+
+
+async def aauthenticate(request):
+    """
+    Resolve request.user as the API's authentication classes would: a
+    "Token <key>" header, otherwise the session. A header the sync view
+    would reject (bad keyword, unknown key, inactive user) falls back.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header:
+        keyword, _, key = header.partition(' ')
+        if keyword != 'Token' or not key.strip():
+            raise Fallback
+        try:
+            request.user, token = await aauthenticate_token(key.strip())
+        except AuthenticationFailed:
+            raise Fallback
+    else:
+        request.user = await request.auser()
+    return request.user
+
+
+async def apaginate(request, queryset):
+    """
+    PageNumberPagination for async views: returns (objects, links) where
+    links holds count/next/previous. Page numbers DRF would reject fall back.
+    """
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    page = request.GET.get('page', '1')
+    if not page.isdigit() or int(page) < 1:
+        raise Fallback
+    number = int(page)
+
+    count = await queryset.acount()
+    pages = max(1, math.ceil(count / page_size))
+    if number > pages:
+        raise Fallback
+
+    offset = (number - 1) * page_size
+    objects = [obj async for obj in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    if number == 1:
+        previous = None
+    elif number == 2:
+        previous = remove_query_param(url, 'page')
+    else:
+        previous = replace_query_param(url, 'page', number - 1)
+    return objects, {
+        'count': count,
+        'next': replace_query_param(url, 'page', number + 1) if number < pages else None,
+        'previous': previous,
+    }
+
+
+def wants_cursor(request):
+    return request.GET.get('pagination') == 'cursor' or 'cursor' in request.GET
+
+
+def async_read_view(sync_view, allow='GET, HEAD, OPTIONS'):
+    """
+    Serve JSON GET/HEAD requests from the decorated async view and
+    everything else, or anything it raises Fallback for, from sync_view.
+    """
+    fallback = sync_to_async(sync_view)
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD') and wants_json(request):
+                try:
+                    await aauthenticate(request)
+                    response = await view(request, *args, **kwargs)
+                except Fallback:
+                    pass
+                else:
+                    response['Allow'] = allow
+                    patch_vary_headers(response, ['Accept'])
+                    return response
+            return await fallback(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,68 @@
+"""
+Database profiles, chosen by the DB_ENGINE environment variable.
+
+sqlite (default)
+    The file at SQLITE_PATH (default: db.sqlite3 next to manage.py). Every
+    new connection runs the SQLITE_PRAGMAS setting through configure_sqlite(),
+    a connection_created hook: WAL lets readers carry on while a checkout
+    writes, synchronous=NORMAL syncs at checkpoints instead of every commit
+    (still safe against corruption in WAL mode), busy_timeout makes a writer
+    wait for the lock rather than fail, and mmap_size reads pages straight
+    from the OS cache. Transactions begin IMMEDIATE, taking the write lock
+    up front: a deferred transaction that reads and then writes cannot wait
+    for the lock in WAL mode and fails with "database is locked" at once.
+
+postgresql
+    POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST and
+    POSTGRES_PORT. Connections are kept for DB_CONN_MAX_AGE seconds
+    (default 60) and checked before reuse, so a worker opens one
+    connection rather than one per request and survives a database
+    restart. Set DB_POOL=1 to use psycopg's connection pool instead
+    (needs psycopg[pool]); prefer it when serving through ASGI, where
+    persistent connections are not reused across requests.
+"""
+import os
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def database_settings(base_dir, environ=os.environ):
+    """The DATABASES['default'] entry for the profile selected by `environ`."""
+    engine = environ.get('DB_ENGINE', 'sqlite')
+    if engine == 'sqlite':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': environ.get('SQLITE_PATH', base_dir / 'db.sqlite3'),
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        }
+    if engine == 'postgresql':
+        database = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': environ.get('POSTGRES_DB', 'ecommerce'),
+            'USER': environ.get('POSTGRES_USER', 'ecommerce'),
+            'PASSWORD': environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+        if environ.get('DB_POOL') == '1':
+            # Django refuses persistent connections on top of a pool
+            database['CONN_MAX_AGE'] = 0
+            database['OPTIONS'] = {'pool': {
+                'min_size': int(environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(environ.get('DB_POOL_MAX_SIZE', 10)),
+            }}
+        return database
+    raise ValueError(f"Unknown DB_ENGINE {engine!r}; expected 'sqlite' or 'postgresql'")
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+connection_created.connect(configure_sqlite, dispatch_uid='ecommerce_project.database.configure_sqlite')
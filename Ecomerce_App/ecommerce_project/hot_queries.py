@@ -0,0 +1,95 @@
+"""
+Registry of hot query shapes, checked by `manage.py explain_hot_queries`.
+
+Each app lists its latency-critical queries in a hot_queries module. The
+entries build their querysets with the same code the app runs: a view's
+get_queryset() and filter backends (view_queryset, detail_queryset) or the
+QuerySet helpers its services use, so the audit follows the real queries:
+
+    @hot_query('order-list')
+    def order_list():
+        return view_queryset(OrderListView)
+
+The command runs EXPLAIN on every registered query and flags plans that
+read a whole table or sort outside an index, so a missing or unusable
+index shows up in review rather than in production latency. Literal ids
+stand in for request parameters; EXPLAIN needs no matching rows.
+"""
+import re
+from django.contrib.auth import get_user_model
+from django.http import HttpRequest, QueryDict
+from django.utils.module_loading import autodiscover_modules
+from rest_framework.request import Request
+from .pagination import OptInCursorPagination
+
+_registry = {}
+
+# Plan lines that mean "every row of the table is read", per database vendor.
+# SQLite's "SCAN t USING [COVERING] INDEX i" walks an index in order and is
+# fine; a bare "SCAN t" is not.
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (\w+)\s*$'),
+    'postgresql': re.compile(r'\bSeq Scan on (\w+)'),
+}
+SORT_PATTERNS = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (?:ORDER BY|RIGHT PART OF ORDER BY)'),
+    'postgresql': re.compile(r'^\s*(?:->\s*)?Sort\b'),
+}
+
+
+def hot_query(name):
+    """Register a function returning the QuerySet for a hot query."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def make_view(view_class, query='', user_id=1, **kwargs):
+    """`view_class` set up as for a GET with `query` by user `user_id`, without dispatching."""
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(query)
+    request = Request(http_request)
+    request.user = get_user_model()(pk=user_id)
+    return view_class(request=request, args=(), kwargs=kwargs, format_kwarg=None)
+
+
+def view_queryset(view_class, query='', user_id=1, filters=None, **kwargs):
+    """
+    One page of what a list view returns: get_queryset() through the filter
+    backends, narrowed by `filters`, ordered and sliced as its paginator would.
+    """
+    view = make_view(view_class, query, user_id, **kwargs)
+    queryset = view.filter_queryset(view.get_queryset()).filter(**(filters or {}))
+    paginator = view.paginator
+    if paginator is None:
+        return queryset
+    if isinstance(paginator, OptInCursorPagination) and paginator.wants_cursor(view.request):
+        ordering = paginator.cursor_class().get_ordering(view.request, queryset, view)
+        queryset = queryset.order_by(*ordering)
+    return queryset[:paginator.get_page_size(view.request)]
+
+
+def detail_queryset(view_class, pk=1, user_id=1, **kwargs):
+    """The lookup a detail view's get_object() runs (.get() drops the ordering)."""
+    view = make_view(view_class, user_id=user_id, pk=pk, **kwargs)
+    return view.filter_queryset(view.get_queryset()).filter(**{view.lookup_field: pk}).order_by()
+
+
+def registered_queries():
+    autodiscover_modules('hot_queries')
+    return dict(sorted(_registry.items()))
+
+
+def find_problems(plan, vendor):
+    """
+    Return (full_scans, sorts): the plan lines reading a whole table and
+    those sorting rows in memory. None for vendors we cannot read.
+    """
+    if vendor not in FULL_SCAN_PATTERNS:
+        return None
+    lines = [line.strip() for line in plan.splitlines()]
+    scans = [line for line in lines if FULL_SCAN_PATTERNS[vendor].search(line)]
+    sorts = [line for line in lines if SORT_PATTERNS[vendor].search(line)]
+    return scans, sorts
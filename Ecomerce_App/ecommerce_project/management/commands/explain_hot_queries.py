@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from ecommerce_project.hot_queries import find_problems, registered_queries
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every registered hot query and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='Only explain these queries (default: all)',
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Print every plan, not only the flagged ones',
+        )
+        parser.add_argument(
+            '--fail-on-scan', action='store_true',
+            help='Exit with an error when a query scans a whole table (for CI)',
+        )
+
+    def handle(self, *args, **options):
+        queries = registered_queries()
+        unknown = set(options['names']) - set(queries)
+        if unknown:
+            raise CommandError(f"Unknown hot queries: {', '.join(sorted(unknown))}")
+
+        scanning = []
+        for name, build in queries.items():
+            if options['names'] and name not in options['names']:
+                continue
+            plan = build().explain()
+            problems = find_problems(plan, connection.vendor)
+            if problems is None:
+                self.stdout.write(f'{name}: not checked on {connection.vendor}')
+                self.stdout.write(plan)
+                continue
+
+            scans, sorts = problems
+            if scans:
+                scanning.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: full scan'))
+            elif sorts:
+                self.stdout.write(self.style.WARNING(f'{name}: sorts outside an index'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+            if scans or sorts or options['plans']:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if scanning and options['fail_on_scan']:
+            raise CommandError(f"Full table scans in: {', '.join(scanning)}")
@@ -0,0 +1,62 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination that always ends its ordering with the primary key.
+
+    DRF's cursor holds the value of the first ordering field at the page
+    boundary, and the next page filters on that field alone (e.g.
+    created_at < position), so a composite (created_at, id) index is read
+    as a range starting at the cursor rather than skipping OFFSET rows.
+    Rows tied with the boundary value are stepped over with a small offset
+    kept in the cursor; the trailing id makes their order stable across
+    requests. No COUNT(*) is ever issued.
+    """
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination by default, keyset pagination on request.
+
+    Clients opt in with ?pagination=cursor (or by following a link that
+    carries ?cursor=); the response then has the cursor shape
+    {next, previous, results} and skips the count query.
+    """
+    cursor_class = KeysetCursorPagination
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def wants_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_cursor(request):
+            self.cursor_paginator = self.cursor_class()
+            self.cursor_paginator.page_size = self.get_page_size(request)
+            page = self.cursor_paginator.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.cursor_paginator.display_page_controls
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
@@ -0,0 +1,16 @@
+"""Batched deletes for the purge and expiry management commands."""
+
+
+def delete_in_batches(queryset, batch_size=1000):
+    """
+    Delete the rows matching `queryset` batch_size primary keys at a time,
+    so no single statement holds locks on the whole backlog; returns the
+    number of rows of the queryset's model deleted.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        batch = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += model.objects.filter(pk__in=batch).delete()[1].get(model._meta.label, 0)
@@ -0,0 +1,167 @@
+"""
+Token-bucket rate limiting for the API.
+
+Each limit is a bucket per client key (IP address, username or user id)
+that holds up to N tokens and refills at N per period; a request takes one
+token and is refused with 429 and Retry-After when the bucket is empty.
+Limits are DRF throttles, so they run in APIView.initial(), before the
+handler: a refused login never reaches authenticate() and its password
+hashing, and a refused write touches no table.
+
+Configure with the RATE_LIMITS setting:
+
+    RATE_LIMITS = {
+        'BACKEND': 'ecommerce_project.ratelimit.LocalBucketStore',  # or CacheBucketStore
+        'OPTIONS': {'max_entries': 100000},
+        'RATES': {'login-ip': '30/min', 'login-user': '5/min'},
+    }
+
+A scope without a rate is not limited. LocalBucketStore is per process, so
+with several workers each enforces the rate separately; CacheBucketStore
+shares buckets through one of the CACHES (Redis, Memcached).
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'5/min' -> (5, 60): bucket capacity and the seconds to refill it."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def take_token(state, capacity, period, now):
+    """
+    Refill `state` (tokens, updated_at) for the time elapsed and take a
+    token. Returns (new_state, wait): wait is 0 when the request may
+    proceed, otherwise the seconds until a token is available.
+    """
+    tokens, updated_at = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated_at) * capacity / period)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) * period / capacity
+
+
+class LocalBucketStore:
+    """In-process buckets, bounded to the `max_entries` most recently used keys."""
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, period, now):
+        with self._lock:
+            state, wait = take_token(self._buckets.get(key), capacity, period, now)
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets shared through a Django cache. The read-modify-write is not
+    atomic, so concurrent requests for one key may occasionally both get
+    the last token; fine for abuse protection, not for exact quotas.
+    """
+
+    def __init__(self, alias='default', key_prefix='ratelimit'):
+        self.cache = caches[alias]
+        self.key_prefix = key_prefix
+
+    def consume(self, key, capacity, period, now):
+        cache_key = f'{self.key_prefix}:{key}'
+        state, wait = take_token(self.cache.get(cache_key), capacity, period, now)
+        # An untouched bucket is full again after one period
+        self.cache.set(cache_key, state, period)
+        return wait
+
+    def clear(self):
+        """
+        A no-op: the cache is shared with other keys, and buckets are full
+        again within one period anyway. Tests use LocalBucketStore.
+        """
+
+
+_store = None
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        config = getattr(settings, 'RATE_LIMITS', {})
+        store_class = import_string(config.get('BACKEND', 'ecommerce_project.ratelimit.LocalBucketStore'))
+        _store = store_class(**config.get('OPTIONS', {}))
+    return _store
+
+
+def get_rate(scope):
+    rate = getattr(settings, 'RATE_LIMITS', {}).get('RATES', {}).get(scope)
+    return parse_rate(rate) if rate else None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base throttle: get_buckets() yields (scope, ident) pairs, each checked in turn."""
+
+    def get_buckets(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        store = get_bucket_store()
+        now = time.time()
+        for scope, ident in self.get_buckets(request, view):
+            rate = get_rate(scope)
+            if rate is None or not ident:
+                continue
+            wait = store.consume(f'{scope}:{ident}', *rate, now)
+            if wait:
+                self.wait_seconds = wait
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    """Per client IP, and per attempted username across all IPs."""
+
+    def get_buckets(self, request, view):
+        yield 'login-ip', self.get_ident(request)
+        username = request.data.get('username')
+        if isinstance(username, str):
+            yield 'login-user', username.strip().lower()
+
+
+class RegistrationRateThrottle(TokenBucketThrottle):
+    def get_buckets(self, request, view):
+        yield 'register-ip', self.get_ident(request)
+
+
+class WriteRateThrottle(TokenBucketThrottle):
+    """Unsafe methods, per user when authenticated and per client IP otherwise."""
+
+    def get_buckets(self, request, view):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return
+        if request.user and request.user.is_authenticated:
+            yield 'write-user', request.user.pk
+        else:
+            yield 'write-ip', self.get_ident(request)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,13 +45,17 @@ INSTALLED_APPS = [
     'corsheaders',
     
     # Local apps
+    'ecommerce_project',  # Project-wide commands (explain_hot_queries)
     'users',
     'store',
     'cart',
     'orders',
+    'idempotency',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'ecommerce_project.asyncapi.AsyncURLConfMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -62,6 +67,8 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'ecommerce_project.urls'
+# Used instead under ASGI: native async views for the hot read endpoints
+ASYNC_URLCONF = 'ecommerce_project.urls_async'
 
 TEMPLATES = [
     {
@@ -84,11 +91,20 @@ WSGI_APPLICATION = 'ecommerce_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite by default; DB_ENGINE=postgresql and POSTGRES_* select PostgreSQL
+# (see ecommerce_project/database.py)
+from .database import database_settings
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_settings(BASE_DIR),
+}
+
+# Run on every new SQLite connection (see ecommerce_project/database.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'mmap_size': 256 * 1024 * 1024,
 }
 
 
@@ -136,8 +152,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        # API clients send tokens; checking them first skips session work
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -149,10 +166,72 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'ecommerce_project.ratelimit.WriteRateThrottle',
+    ],
+    # Reverse proxies in front of the app. Rate limits key on the client
+    # address; X-Forwarded-For is only trusted for that many hops, since
+    # with None DRF would take it verbatim from the client
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# Token-bucket rate limits, as requests/period (see ecommerce_project/ratelimit.py)
+RATE_LIMITS = {
+    'BACKEND': 'ecommerce_project.ratelimit.LocalBucketStore',
+    'OPTIONS': {'max_entries': 100000},
+    'RATES': {
+        'login-ip': '30/min',
+        'login-user': '5/min',
+        'register-ip': '10/hour',
+        'write-user': '120/min',
+        'write-ip': '300/min',
+    },
+}
+
+# Response cache for anonymous catalog reads (see store/cache.py)
+STORE_RESPONSE_CACHE = {
+    'BACKEND': 'store.cache.LocalLRUBackend',
+    'OPTIONS': {'max_entries': 1024},
+    'TIMEOUTS': {},
+}
+
+# Seconds a cart line holds its stock (see cart/reservations.py)
+CART_RESERVATION_TTL = 15 * 60
+
+# Days an untouched guest cart is kept (see cart/guest.py)
+GUEST_CART_TTL_DAYS = 7
+
+# Order numbers (see orders/numbering.py)
+ORDER_NUMBER_GENERATOR = {
+    'BACKEND': 'orders.numbering.BlockSequenceGenerator',
+    'OPTIONS': {'prefix': 'ORD', 'block_size': 100},
+}
+
+# Development: order emails are printed to the console
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Background job queues and their concurrency limits (see jobs/queue.py)
+JOB_QUEUES = {
+    'default': {'concurrency': 4},
+    'checkout': {'concurrency': 8},
+}
+JOB_LOCK_TIMEOUT = 5 * 60
+
+# Seconds a stored Idempotency-Key response is replayed (see idempotency/decorators.py)
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+# Seconds before a claimed key whose request never answered can be claimed again
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Days an API token stays valid after its last use (see users/tokens.py)
+AUTH_TOKEN_TTL_DAYS = 14
+
+# Per-process cache of authenticated API tokens (see users/authentication.py)
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': 60,
 }
 
 # Media files configuration
-import os
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -172,4 +251,10 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Guest carts are identified by the X-Cart-Token header; mutating calls may
+# send an Idempotency-Key
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = (*default_headers, 'x-cart-token', 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['X-Cart-Token', 'Idempotent-Replayed', 'Retry-After']
+
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development
@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Test helpers for keeping endpoints free of N+1 query regressions.
+
+    assertMaxQueries fails when the block runs more than `limit` queries and
+    lists the captured SQL, so a new lazy relation shows up in the output.
+    """
+
+    @contextmanager
+    def assertMaxQueries(self, limit, using=connection):
+        with CaptureQueriesContext(using) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > limit:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f'{executed} queries executed, budget is {limit}\n{queries}')
+
+    def assertConstantQueries(self, request, grow, limit=None):
+        """
+        Run `request()` before and after `grow()` adds more rows and check
+        that the query count does not change (and stays within `limit`).
+        """
+        with CaptureQueriesContext(connection) as before:
+            request()
+        grow()
+        with CaptureQueriesContext(connection) as after:
+            request()
+        self.assertEqual(
+            len(before.captured_queries), len(after.captured_queries),
+            'query count grew with the number of rows',
+        )
+        if limit is not None:
+            self.assertLessEqual(len(after.captured_queries), limit)
@@ -0,0 +1,46 @@
+from io import StringIO
+from pathlib import Path
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from .database import database_settings
+
+
+class DatabaseProfileTests(TestCase):
+    def test_sqlite_is_the_default(self):
+        database = database_settings(Path('/srv/app'), environ={})
+        self.assertEqual(database['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(database['NAME'], Path('/srv/app/db.sqlite3'))
+        self.assertEqual(database['OPTIONS'], {'transaction_mode': 'IMMEDIATE'})
+
+    def test_postgresql_keeps_connections(self):
+        environ = {'DB_ENGINE': 'postgresql', 'POSTGRES_HOST': 'db', 'DB_CONN_MAX_AGE': '300'}
+        database = database_settings(Path('/srv/app'), environ=environ)
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(database['HOST'], 'db')
+        self.assertEqual(database['CONN_MAX_AGE'], 300)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+
+        pooled = database_settings(Path('/srv/app'), environ={**environ, 'DB_POOL': '1'})
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS'], {'pool': {'min_size': 2, 'max_size': 10}})
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            database_settings(Path('/srv/app'), environ={'DB_ENGINE': 'oracle'})
+
+    def test_new_sqlite_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+
+
+class HotQueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_hot_queries', fail_on_scan=True, stdout=out)
+        for name in ('product-list', 'order-list', 'cart-items', 'claim-jobs', 'user-addresses'):
+            self.assertIn(f'{name}: ok', out.getvalue())
@@ -0,0 +1,20 @@
+"""
+URLconf for ASGI requests (see ecommerce_project/asyncapi.py).
+
+The hot read endpoints resolve to native async views first; every other
+URL falls through to the regular URLconf.
+"""
+from django.urls import include, path
+from cart import async_views as cart_views
+from orders import async_views as order_views
+from store import async_views as store_views
+
+urlpatterns = [
+    path('api/store/products/', store_views.product_list),
+    path('api/store/products/<int:pk>/', store_views.product_detail),
+    path('api/store/featured/', store_views.featured_products),
+    path('api/store/search/', store_views.search_products),
+    path('api/cart/', cart_views.cart_detail),
+    path('api/orders/', order_views.order_list),
+    path('', include('ecommerce_project.urls')),
+]
@@ -78,12 +78,12 @@ export const storeService = {
 
   getFeaturedProducts: async (): Promise<Product[]> => {
     const response = await api.get('/store/featured/');
-    return response.data;
+    return response.data.results;
   },
 
   searchProducts: async (query: string): Promise<Product[]> => {
     const response = await api.get(`/store/search/?q=${encodeURIComponent(query)}`);
-    return response.data;
+    return response.data.results;
   },
 
   getProductReviews: async (productId: number): Promise<Review[]> => {
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import IdempotencyKey
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'scope', 'endpoint', 'status_code', 'created_at', 'expires_at')
+    list_filter = ('status_code', 'created_at')
+    search_fields = ('key', 'scope', 'endpoint')
+    ordering = ('-created_at',)
+    readonly_fields = ('request_hash', 'response_data', 'response_headers')
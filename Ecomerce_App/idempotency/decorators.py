@@ -0,0 +1,167 @@
+"""
+Idempotency-Key support for mutating API views.
+
+A client that may retry a request sends a unique Idempotency-Key header.
+The first request with a key claims a row in IdempotencyKey before the
+view runs and stores the response once it finishes; retries with the same
+key get that stored response back (marked Idempotent-Replayed: true)
+without the view running again, so stock, orders and carts are only
+touched once. Keys are scoped to the caller and expire after
+IDEMPOTENCY_KEY_TTL seconds; `purge_idempotency_keys` deletes expired rows.
+
+A claim is a lease of IDEMPOTENCY_LOCK_TIMEOUT seconds: if the worker
+running the first request dies, a retry after the lease takes the key
+over instead of getting 409 until the key expires. The view runs in one
+transaction with the write of its response, which only succeeds while the
+claim is still held, so a request whose key was taken over commits nothing.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL = 60 * 60 * 24
+DEFAULT_LOCK_TIMEOUT = 60
+# Response headers worth replaying (guest carts hand out their token)
+REPLAYED_HEADERS = ('X-Cart-Token', 'Location')
+
+
+def key_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL))
+
+
+def lock_timeout():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT))
+
+
+class KeyTakenOver(Exception):
+    """The claim lapsed and another request holds the key now."""
+
+
+def request_scope(request):
+    """Who the key belongs to, or None when the caller cannot be told apart."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    cart_token = request.META.get('HTTP_X_CART_TOKEN')
+    if cart_token:
+        return f'guest:{cart_token[:32]}'
+    return None
+
+
+def request_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, cls=JSONEncoder)
+    raw = '|'.join((request.method, request.path, payload))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def claim_key(key, scope, endpoint, fingerprint):
+    """
+    Insert the pending row for key, or return the existing live one.
+    Returns (row, created).
+    """
+    now = timezone.now()
+    # Expired keys, and claims whose request died before answering
+    IdempotencyKey.objects.filter(
+        Q(expires_at__lte=now) | Q(status_code__isnull=True, locked_until__lte=now),
+        scope=scope, key=key,
+    ).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                key=key, scope=scope, endpoint=endpoint, request_hash=fingerprint,
+                locked_until=now + lock_timeout(), expires_at=now + key_ttl(),
+            ), True
+    except IntegrityError:
+        return IdempotencyKey.objects.get(scope=scope, key=key), False
+
+
+def replay(record):
+    response = Response(record.response_data, status=record.status_code)
+    for header, value in record.response_headers.items():
+        response[header] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def in_progress():
+    return Response({
+        'error': 'A request with this Idempotency-Key is still in progress'
+    }, status=status.HTTP_409_CONFLICT)
+
+
+def store_response(record, response):
+    """Save the response on the claimed row; KeyTakenOver if the claim lapsed."""
+    stored = IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).update(
+        status_code=response.status_code,
+        response_data=getattr(response, 'data', None),
+        response_headers={h: response[h] for h in REPLAYED_HEADERS if h in response},
+    )
+    if not stored:
+        raise KeyTakenOver
+
+
+def idempotent(view):
+    """
+    Make a DRF function view honour the Idempotency-Key header. Apply it
+    below @api_view/@permission_classes so the caller is authenticated.
+
+    Responses below 500 are stored and replayed; a 5xx or an exception
+    rolls the view back and releases the key so the client can retry.
+    Reusing a key for a different request body or endpoint is answered
+    with 422, and a retry that arrives while the first request is still
+    running with 409 and Retry-After.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER, '').strip()
+        scope = request_scope(request)
+        if not key or scope is None:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({
+                'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        record, created = claim_key(key, scope, request.path, fingerprint)
+        if not created:
+            if record.request_hash != fingerprint:
+                return Response({
+                    'error': 'Idempotency-Key was already used for a different request'
+                }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if not record.is_complete:
+                response = in_progress()
+                response['Retry-After'] = max(1, int((record.locked_until - timezone.now()).total_seconds()))
+                return response
+            return replay(record)
+
+        try:
+            with transaction.atomic():
+                response = view(request, *args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                else:
+                    store_response(record, response)
+        except KeyTakenOver:
+            return in_progress()
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        return response
+    return wrapped
+
+
+def expired_keys(now):
+    return IdempotencyKey.objects.filter(expires_at__lte=now)
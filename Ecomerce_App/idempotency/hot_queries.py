@@ -0,0 +1,15 @@
+from django.utils import timezone
+from ecommerce_project.hot_queries import hot_query
+from .decorators import expired_keys
+from .models import IdempotencyKey
+
+
+@hot_query('idempotency-key')
+def idempotency_key():
+    # claim_key() reading back a key that is already taken
+    return IdempotencyKey.objects.filter(scope='user:1', key='key')
+
+
+@hot_query('expired-idempotency-keys')
+def expired_idempotency_keys():
+    return expired_keys(timezone.now()).values_list('pk', flat=True)[:1000]
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ecommerce_project.purge import delete_in_batches
+from idempotency.decorators import expired_keys
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses that have expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of keys to delete per statement',
+        )
+
+    def handle(self, *args, **options):
+        purged = delete_in_batches(expired_keys(timezone.now()), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} idempotency keys'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('idempotency', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='locked_until',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
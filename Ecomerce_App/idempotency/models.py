@@ -0,0 +1,33 @@
+from django.db import models
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+class IdempotencyKey(models.Model):
+    """
+    A client-supplied Idempotency-Key and the response it produced.
+
+    status_code stays null while the first request is still running; past
+    locked_until such a row is taken to be abandoned and may be claimed again.
+    """
+    key = models.CharField(max_length=255)
+    # Who sent the key: "user:<id>" or "guest:<cart token>"
+    scope = models.CharField(max_length=64)
+    endpoint = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Encoded like DRF's JSON renderer so replays render identically
+    response_data = models.JSONField(null=True, blank=True, encoder=JSONEncoder)
+    response_headers = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    locked_until = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('scope', 'key')
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+    @property
+    def is_complete(self):
+        return self.status_code is not None
@@ -0,0 +1,129 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from cart.models import Cart, CartItem
+from orders.checkout import place_order
+from orders.models import Order
+from store.models import Category, Product
+from users.models import Address, CustomUser
+from .models import IdempotencyKey
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='buyer', email='buyer@example.com')
+        self.address = Address.objects.create(
+            user=self.user, street_address='1 Main St', city='Springfield',
+            state='IL', postal_code='62701', country='US', is_default=True,
+        )
+        self.product = Product.objects.create(
+            name='Clean Code', description='Clean Code', price=Decimal('10.00'),
+            category=Category.objects.create(name='Books'), stock_quantity=5,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_order(self, key, **data):
+        data.setdefault('shipping_address_id', self.address.pk)
+        data.setdefault('payment_method', 'credit_card')
+        return self.client.post('/api/orders/create/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_checkout_is_replayed(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+
+        first = self.create_order('order-1')
+        retry = self.create_order('order-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 3)
+
+    def test_key_reuse_with_other_body_is_rejected(self):
+        add = {'product_id': self.product.pk, 'quantity': 1}
+        self.assertEqual(self.client.post('/api/cart/add/', add, format='json', HTTP_IDEMPOTENCY_KEY='k').status_code, 201)
+        self.assertEqual(self.client.post('/api/cart/add/', add, format='json', HTTP_IDEMPOTENCY_KEY='k').status_code, 201)
+        self.assertEqual(CartItem.objects.get().quantity, 1)
+
+        response = self.client.post('/api/cart/add/', {**add, 'quantity': 2}, format='json', HTTP_IDEMPOTENCY_KEY='k')
+        self.assertEqual(response.status_code, 422)
+
+    def test_keys_are_scoped_per_caller(self):
+        other = CustomUser.objects.create(username='other', email='other@example.com')
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        add = {'product_id': self.product.pk, 'quantity': 1}
+        self.client.post('/api/cart/add/', add, format='json', HTTP_IDEMPOTENCY_KEY='shared')
+        response = other_client.post('/api/cart/add/', add, format='json', HTTP_IDEMPOTENCY_KEY='shared')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(CartItem.objects.count(), 2)
+
+    def test_in_flight_key_conflicts(self):
+        # A raised 404 (no cart yet) leaves no key behind
+        self.assertEqual(self.create_order('busy').status_code, 404)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        # An empty cart's 400 is stored like any other non-5xx answer
+        Cart.objects.create(user=self.user)
+        self.assertEqual(self.create_order('busy').status_code, 400)
+        record = IdempotencyKey.objects.get(key='busy')
+        self.assertEqual(record.status_code, 400)
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(status_code=None)
+        self.assertEqual(self.create_order('busy').status_code, 409)
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(expires_at=timezone.now())
+        self.assertNotIn('Idempotent-Replayed', self.create_order('busy'))
+
+    def test_abandoned_claim_is_taken_over_after_its_lease(self):
+        Cart.objects.create(user=self.user)
+        self.assertEqual(self.create_order('crashed').status_code, 400)
+        # As left by a worker killed mid-request
+        record = IdempotencyKey.objects.get(key='crashed')
+        IdempotencyKey.objects.filter(pk=record.pk).update(status_code=None)
+
+        response = self.create_order('crashed')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('Retry-After', response)
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(locked_until=timezone.now())
+        response = self.create_order('crashed')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_request_that_lost_its_claim_commits_nothing(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+
+        def slow_place_order(*args):
+            order = place_order(*args)
+            # The lease ran out and a retry took the key over meanwhile
+            IdempotencyKey.objects.filter(key='slow').delete()
+            return order
+
+        with mock.patch('orders.views.place_order', side_effect=slow_place_order):
+            self.assertEqual(self.create_order('slow').status_code, 409)
+        self.assertFalse(Order.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 5)
+
+    def test_purge_deletes_expired_keys(self):
+        for i in range(3):
+            IdempotencyKey.objects.create(
+                key=f'k{i}', scope='user:1', endpoint='/', request_hash='x',
+                expires_at=timezone.now() - timedelta(seconds=1),
+            )
+        IdempotencyKey.objects.create(
+            key='live', scope='user:1', endpoint='/', request_hash='x',
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        call_command('purge_idempotency_keys', batch_size=2, stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['live'])
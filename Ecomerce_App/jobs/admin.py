@@ -0,0 +1,19 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'queue', 'status', 'attempts', 'run_at', 'locked_by', 'created_at')
+    list_filter = ('queue', 'status', 'task')
+    search_fields = ('task', 'last_error')
+    ordering = ('run_at',)
+    readonly_fields = ('attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'updated_at')
+    actions = ['retry_jobs']
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', attempts=0, run_at=timezone.now(), last_error='',
+        )
+        self.message_user(request, f'{updated} jobs queued for retry.')
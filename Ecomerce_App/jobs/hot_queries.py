@@ -0,0 +1,13 @@
+from django.utils import timezone
+from ecommerce_project.hot_queries import hot_query
+from .queue import due_jobs, running_jobs
+
+
+@hot_query('claim-jobs')
+def claim_jobs():
+    return due_jobs('default', timezone.now()).values_list('pk', flat=True)[:8]
+
+
+@hot_query('running-jobs')
+def running_job_count():
+    return running_jobs('default')
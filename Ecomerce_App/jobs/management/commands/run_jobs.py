@@ -0,0 +1,58 @@
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from jobs.queue import run_pending, worker_name
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', action='append', dest='queues',
+            help='Queue to serve (repeatable); defaults to every queue in JOB_QUEUES',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Jobs this worker runs at once (queue limits still apply)',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait when no job is due',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run the jobs that are due now and exit',
+        )
+
+    def handle(self, *args, **options):
+        queues = options['queues'] or list(getattr(settings, 'JOB_QUEUES', {'default': {}}))
+        name = worker_name()
+
+        if options['once']:
+            ran = run_pending(queues, worker=name)
+            self.stdout.write(self.style.SUCCESS(f'Ran {ran} jobs'))
+            return
+
+        self.stdout.write(f'Worker {name} serving {", ".join(queues)} with {options["threads"]} threads')
+        threads = [
+            threading.Thread(target=self.work, args=(queues, f'{name}/{i}', options['sleep']), daemon=True)
+            for i in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping worker')
+
+    def work(self, queues, worker, sleep):
+        try:
+            while True:
+                close_old_connections()
+                if not run_pending(queues, worker=worker, limit=1):
+                    time.sleep(sleep)
+        finally:
+            connection.close()
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueueLock',
+            fields=[
+                ('queue', models.CharField(max_length=50, primary_key=True, serialize=False)),
+            ],
+        ),
+    ]
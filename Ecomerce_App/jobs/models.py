@@ -0,0 +1,39 @@
+from django.db import models
+from django.utils import timezone
+
+class Job(models.Model):
+    """A unit of background work; succeeded jobs are deleted."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Claiming: next due job per queue; concurrency: running per queue
+            models.Index(fields=['queue', 'status', 'run_at'], name='job_queue_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} [{self.queue}] {self.status}"
+
+class QueueLock(models.Model):
+    """One row per queue, locked while a worker claims jobs from it."""
+    queue = models.CharField(max_length=50, primary_key=True)
+
+    def __str__(self):
+        return self.queue
@@ -0,0 +1,176 @@
+"""
+Database-backed background job queue.
+
+Functions decorated with @task can be enqueued as Job rows; enqueueing
+inside a transaction makes the job part of it, so work is only scheduled
+when the surrounding change commits. Workers (`manage.py run_jobs`) claim
+due jobs, run them and delete them on success. A failing job is retried
+with exponential backoff until max_attempts, then left as 'failed' for
+inspection in the admin; the task's on_failure hook, if any, is called
+with the same kwargs so the work it was meant to finish can be unwound.
+
+Per-queue limits on concurrently running jobs, across all workers, come
+from the JOB_QUEUES setting:
+
+    JOB_QUEUES = {
+        'default': {'concurrency': 4},
+        'checkout': {'concurrency': 8},
+    }
+
+Claims on a queue take a lock on its QueueLock row, so the running
+count and the claim are one step across workers.
+
+Jobs left 'running' by a worker that died are picked up again once their
+lock is older than JOB_LOCK_TIMEOUT seconds.
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job, QueueLock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_LOCK_TIMEOUT = 5 * 60
+BACKOFF_BASE = 5
+BACKOFF_MAX = 60 * 60
+
+_registry = {}
+
+
+class PermanentFailure(Exception):
+    """Raised by a task to fail at once, without further retries."""
+
+
+def task(queue='default', max_attempts=5, on_failure=None):
+    """
+    Register a function as a background task taking JSON-able kwargs.
+    `on_failure(**kwargs)` runs once when a job of the task fails for good.
+    """
+    def decorator(func):
+        func.task_name = f'{func.__module__}.{func.__name__}'
+        func.queue = queue
+        func.max_attempts = max_attempts
+        func.on_failure = on_failure
+        _registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, delay=0, **kwargs):
+    """Schedule func(**kwargs) to run `delay` seconds from now."""
+    return Job.objects.create(
+        queue=func.queue,
+        task=func.task_name,
+        payload=kwargs,
+        max_attempts=func.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def queue_concurrency(queue):
+    return getattr(settings, 'JOB_QUEUES', {}).get(queue, {}).get('concurrency', DEFAULT_CONCURRENCY)
+
+
+def lock_timeout():
+    return timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT))
+
+
+def backoff_delay(attempts):
+    """Seconds before retry number `attempts`: exponential with jitter."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay + random.uniform(0, delay / 10)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def due_jobs(queue, now):
+    """Queued jobs of `queue` that are due, oldest first."""
+    return Job.objects.filter(queue=queue, status='queued', run_at__lte=now).order_by('run_at', 'id')
+
+
+def running_jobs(queue):
+    return Job.objects.filter(queue=queue, status='running')
+
+
+def claim_jobs(queue, worker, limit=None, now=None):
+    """
+    Mark up to `limit` due jobs of `queue` as running for `worker`, within
+    the queue's concurrency limit, and return them.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Claims on one queue are serialized: without the lock, two workers
+        # could both count the same free slots and exceed the concurrency
+        QueueLock.objects.select_for_update().get_or_create(queue=queue)
+
+        # Jobs whose worker died count as due again
+        stale = Job.objects.filter(queue=queue, status='running', locked_at__lt=now - lock_timeout())
+        stale.update(status='queued', locked_by='', locked_at=None)
+
+        running = running_jobs(queue).count()
+        free = queue_concurrency(queue) - running
+        if limit is not None:
+            free = min(free, limit)
+        if free <= 0:
+            return []
+
+        candidates = list(due_jobs(queue, now).select_for_update(skip_locked=True).values_list('pk', flat=True)[:free])
+        if not candidates:
+            return []
+        # The status condition keeps two workers from claiming the same row
+        # on databases without SKIP LOCKED
+        Job.objects.filter(pk__in=candidates, status='queued').update(
+            status='running', locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        )
+        return list(Job.objects.filter(pk__in=candidates, status='running', locked_by=worker, locked_at=now))
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome; returns True on success."""
+    func = _registry.get(job.task)
+    try:
+        if func is None:
+            raise PermanentFailure(f'Unknown task {job.task}')
+        func(**job.payload)
+    except Exception as e:
+        error = ''.join(traceback.format_exception(e))
+        if isinstance(e, PermanentFailure) or job.attempts >= job.max_attempts:
+            logger.error('Job %s (%s) failed permanently: %s', job.pk, job.task, e)
+            Job.objects.filter(pk=job.pk).update(status='failed', locked_by='', locked_at=None, last_error=error)
+            if func is not None and func.on_failure is not None:
+                try:
+                    func.on_failure(**job.payload)
+                except Exception:
+                    logger.exception('on_failure hook of job %s (%s) failed', job.pk, job.task)
+        else:
+            logger.warning('Job %s (%s) failed, retrying: %s', job.pk, job.task, e)
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', locked_by='', locked_at=None, last_error=error,
+                run_at=timezone.now() + timedelta(seconds=backoff_delay(job.attempts)),
+            )
+        return False
+
+    Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def run_pending(queues=None, worker=None, limit=None):
+    """Claim and run due jobs once per queue; returns the number run."""
+    queues = queues or list(getattr(settings, 'JOB_QUEUES', {'default': {}}))
+    worker = worker or worker_name()
+    ran = 0
+    for queue in queues:
+        for job in claim_jobs(queue, worker, limit=limit):
+            run_job(job)
+            ran += 1
+    return ran
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from .models import Job, QueueLock
+from .queue import PermanentFailure, claim_jobs, enqueue, run_pending, task
+
+calls = []
+
+
+@task(queue='default', max_attempts=2)
+def record_call(value):
+    calls.append(value)
+
+
+@task(queue='default', max_attempts=2)
+def flaky(value):
+    raise RuntimeError('try again')
+
+
+@task(queue='default')
+def broken(value):
+    raise PermanentFailure('do not retry')
+
+
+@task(queue='default', on_failure=lambda value: calls.append(('failed', value)))
+def broken_with_hook(value):
+    raise PermanentFailure('do not retry')
+
+
+@override_settings(JOB_QUEUES={'default': {'concurrency': 2}})
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_successful_jobs_run_once_and_are_deleted(self):
+        enqueue(record_call, value=1)
+        enqueue(record_call, delay=60, value=2)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [1])
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'value': 2}])
+
+    def test_failures_back_off_then_fail(self):
+        job = enqueue(flaky, value=1)
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('try again', job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_permanent_failure_skips_retries(self):
+        job = enqueue(broken, value=1)
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 1))
+
+    def test_on_failure_runs_once_the_job_fails_for_good(self):
+        enqueue(broken_with_hook, value=1)
+        run_pending()
+        run_pending()
+        self.assertEqual(calls, [('failed', 1)])
+
+    def test_concurrency_limit_counts_running_jobs(self):
+        for i in range(4):
+            enqueue(record_call, value=i)
+        self.assertEqual(len(claim_jobs('default', 'worker-a')), 2)
+        self.assertEqual(claim_jobs('default', 'worker-b'), [])
+
+        # A lock older than JOB_LOCK_TIMEOUT belongs to a dead worker
+        Job.objects.filter(status='running').update(locked_at=timezone.now() - timedelta(hours=1))
+        reclaimed = claim_jobs('default', 'worker-b')
+        self.assertEqual(len(reclaimed), 2)
+        self.assertEqual({job.locked_by for job in reclaimed}, {'worker-b'})
+
+    def test_claim_locks_the_queue_before_counting(self):
+        enqueue(record_call, value=1)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(len(claim_jobs('default', 'worker-a')), 1)
+        tables = [query['sql'] for query in context.captured_queries if 'jobs_' in query['sql']]
+        self.assertIn('jobs_queuelock', tables[0])
+        self.assertTrue(QueueLock.objects.filter(queue='default').exists())
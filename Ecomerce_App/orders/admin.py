@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Order, OrderItem, Payment
+from .state import transition
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -16,8 +17,36 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ('status', 'payment_status', 'created_at')
     search_fields = ('order_number', 'user__username')
     ordering = ('-created_at',)
-    readonly_fields = ('order_number', 'final_total')
+    # Status changes go through the actions, which validate the transition
+    readonly_fields = ('order_number', 'status', 'final_total', 'items_count')
     inlines = [OrderItemInline, PaymentInline]
+    actions = ['mark_shipped', 'mark_delivered', 'cancel_orders']
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        order = form.instance
+        Order.objects.filter(pk=order.pk).update(items_count=order.items.count())
+
+    def transition_selected(self, request, queryset, target):
+        selected = list(queryset.values_list('pk', flat=True))
+        moved = transition(selected, target)
+        skipped = len(selected) - len(moved)
+        message = f'{len(moved)} orders marked {target}.'
+        if skipped:
+            message += f' {skipped} skipped: their status does not allow it.'
+        self.message_user(request, message)
+
+    @admin.action(description='Mark selected orders as shipped')
+    def mark_shipped(self, request, queryset):
+        self.transition_selected(request, queryset, 'shipped')
+
+    @admin.action(description='Mark selected orders as delivered')
+    def mark_delivered(self, request, queryset):
+        self.transition_selected(request, queryset, 'delivered')
+
+    @admin.action(description='Cancel selected orders, restock and refund')
+    def cancel_orders(self, request, queryset):
+        self.transition_selected(request, queryset, 'cancelled')
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
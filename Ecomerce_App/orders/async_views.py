@@ -0,0 +1,14 @@
+"""Async order list (see ecommerce_project/asyncapi.py)."""
+from ecommerce_project.asyncapi import Fallback, apaginate, async_read_view, json_response, wants_cursor
+from . import views
+from .serializers import OrderListSerializer
+
+
+@async_read_view(views.OrderListView.as_view(), allow='GET, HEAD, OPTIONS')
+async def order_list(request):
+    if not request.user.is_authenticated or wants_cursor(request):
+        raise Fallback
+    view = views.OrderListView(request=request, kwargs={}, format_kwarg=None)
+    orders, links = await apaginate(request, view.get_queryset())
+    serializer = OrderListSerializer(orders, many=True, context={'request': request})
+    return json_response({**links, 'results': serializer.data})
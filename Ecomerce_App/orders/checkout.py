@@ -0,0 +1,103 @@
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from cart.models import CartItem
+from cart.reservations import held_quantity, release
+from jobs.queue import enqueue
+from store.inventory import take_stock
+from .models import Order, OrderItem, Payment
+from .numbering import get_order_number_generator, next_order_number
+from .tasks import capture_payment
+
+SHIPPING_COST = Decimal('10.00')  # Fixed shipping cost for demo
+TAX_RATE = Decimal('0.08')
+ORDER_NUMBER_ATTEMPTS = 3
+
+
+class EmptyCart(Exception):
+    pass
+
+
+def insert_order(order_number, **fields):
+    """
+    Create the Order row. Should order_number already be taken (e.g. a
+    sequence block handed out twice after a rolled back allocation), the
+    generator drops its block and the insert is retried with a new number.
+    """
+    for attempt in range(ORDER_NUMBER_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return Order.objects.create(order_number=order_number, **fields)
+        except IntegrityError:
+            if attempt == ORDER_NUMBER_ATTEMPTS - 1 or not Order.objects.filter(order_number=order_number).exists():
+                raise
+            generator = get_order_number_generator()
+            generator.reset()
+            order_number = generator.next_number()
+
+
+def place_order(user, cart, shipping_address, payment_method, notes=''):
+    """
+    Turn a cart into a pending order with a fixed number of queries.
+
+    The cart is read once with its products, all items go in with a single
+    bulk_create and stock is taken with conditional updates (see
+    store.inventory.take_stock). Payment capture runs afterwards as a
+    background job (orders.tasks.capture_payment) that confirms the order,
+    or cancels it and returns the stock. The returned order has its items
+    and payment cached so it can be serialized without going back to the
+    database.
+    """
+    cart_items = list(cart.items.select_related('product'))
+    if not cart_items:
+        raise EmptyCart()
+
+    total_amount = sum((item.product.price * item.quantity for item in cart_items), Decimal('0.00'))
+    tax_amount = (total_amount * TAX_RATE).quantize(Decimal('0.01'))
+
+    # Drawn before the order transaction, so a plain failed checkout does not
+    # roll back a block allocation. Under an Idempotency-Key the whole view is
+    # one transaction and the allocation can still be rolled back; the block
+    # is then handed out twice and insert_order() redraws on the collision.
+    order_number = next_order_number()
+
+    with transaction.atomic():
+        order = insert_order(
+            order_number,
+            user=user,
+            status='pending',
+            payment_status='pending',
+            shipping_address=shipping_address,
+            total_amount=total_amount,
+            shipping_cost=SHIPPING_COST,
+            tax_amount=tax_amount,
+            items_count=len(cart_items),
+            notes=notes
+        )
+        items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=item.product, quantity=item.quantity, price=item.product.price)
+            for item in cart_items
+        ])
+
+        # Any shortage raises InsufficientStock and rolls back the whole order.
+        # Units held by other carts are off limits; this cart's own holds
+        # are consumed along with the cart items.
+        take_stock(
+            {item.product_id: item.quantity for item in cart_items},
+            held=held_quantity(exclude_cart=cart),
+        )
+
+        payment = Payment.objects.create(
+            order=order,
+            payment_method=payment_method,
+            amount=order.final_total,
+        )
+        CartItem.objects.filter(cart=cart).delete()
+        release(cart)
+        # Queued in the same transaction: no job without an order and vice versa
+        enqueue(capture_payment, order_id=order.pk)
+
+    order.payment = payment
+    # What items_prefetch() would load: the rows just inserted, in id order,
+    # with the products read from the cart
+    order._prefetched_objects_cache = {'items': items}
+    return order
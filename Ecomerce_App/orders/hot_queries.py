@@ -0,0 +1,24 @@
+from ecommerce_project.hot_queries import detail_queryset, hot_query, view_queryset
+from .models import items_prefetch
+from .views import OrderDetailView, OrderListView
+
+
+@hot_query('order-list')
+def order_list():
+    return view_queryset(OrderListView)
+
+
+@hot_query('order-list-cursor')
+def order_list_cursor():
+    return view_queryset(OrderListView, 'pagination=cursor')
+
+
+@hot_query('order-detail')
+def order_detail():
+    return detail_queryset(OrderDetailView)
+
+
+@hot_query('order-detail-items')
+def order_detail_items():
+    # What the prefetch runs for the order detail and checkout responses
+    return items_prefetch().queryset.filter(order_id__in=[1])
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:47
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    lines = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(n=Count('pk')).values('n')
+    Order.objects.update(
+        final_total=F('total_amount') + F('shipping_cost') + F('tax_amount'),
+        items_count=Coalesce(Subquery(lines), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_number_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='final_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
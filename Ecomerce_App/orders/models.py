@@ -1,7 +1,17 @@
 from django.db import models
+from django.db.models import Prefetch
 from users.models import CustomUser, Address
 from store.models import Product
 
+def items_prefetch():
+    """Order items as OrderSerializer lists them, with their products."""
+    return Prefetch('items', OrderItem.objects.select_related('product').order_by('id'))
+
+class OrderQuerySet(models.QuerySet):
+    def for_detail(self):
+        """Load what OrderSerializer reads: the payment joined, items with products in one extra query."""
+        return self.select_related('payment').prefetch_related(items_prefetch())
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -15,6 +25,7 @@ class Order(models.Model):
         ('pending', 'Pending'),
         ('paid', 'Paid'),
         ('failed', 'Failed'),
+        ('refund_pending', 'Refund pending'),
         ('refunded', 'Refunded'),
     ]
 
@@ -26,19 +37,27 @@ class Order(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     shipping_cost = models.DecimalField(max_digits=8, decimal_places=2, default=0)
     tax_amount = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    # Denormalized at checkout so order lists need no join or aggregate
+    final_total = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    items_count = models.PositiveIntegerField(default=0, editable=False)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_newest_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number} by {self.user.username}"
 
-    @property
-    def final_total(self):
-        return self.total_amount + self.shipping_cost + self.tax_amount
+    def save(self, *args, **kwargs):
+        self.final_total = self.total_amount + self.shipping_cost + self.tax_amount
+        super().save(*args, **kwargs)
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -72,3 +91,11 @@ class Payment(models.Model):
 
     def __str__(self):
         return f"Payment for Order {self.order.order_number} - {self.payment_method}"
+
+class OrderNumberSequence(models.Model):
+    """Next unallocated value of a block-allocated order number sequence."""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
@@ -0,0 +1,106 @@
+"""
+Order number generators.
+
+The default BlockSequenceGenerator hands out numbers such as
+ORD-20261018-0000012345: a date prefix plus a zero-padded global sequence.
+Each process reserves a block of sequence values with one UPDATE on
+OrderNumberSequence and then numbers orders from memory, so ordinary
+checkouts make no extra query. Numbers are unique across processes, sort
+by date and then roughly by creation order, and new rows land at the right
+edge of the unique index instead of scattering across it.
+
+Configure with the ORDER_NUMBER_GENERATOR setting:
+
+    ORDER_NUMBER_GENERATOR = {
+        'BACKEND': 'orders.numbering.BlockSequenceGenerator',
+        'OPTIONS': {'prefix': 'ORD', 'block_size': 100},
+    }
+"""
+import os
+import threading
+import uuid
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import OrderNumberSequence
+
+
+class OrderNumberGenerator:
+    def next_number(self):
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget any locally cached state (called after a collision)."""
+
+
+class RandomHexGenerator(OrderNumberGenerator):
+    """The original ORD-XXXXXXXX scheme; unordered and collision-prone."""
+
+    def __init__(self, prefix='ORD'):
+        self.prefix = prefix
+
+    def next_number(self):
+        return f"{self.prefix}-{uuid.uuid4().hex[:8].upper()}"
+
+
+class BlockSequenceGenerator(OrderNumberGenerator):
+    def __init__(self, prefix='ORD', block_size=100, sequence='order', width=10):
+        self.prefix = prefix
+        self.block_size = block_size
+        self.sequence = sequence
+        self.width = width
+        self._lock = threading.Lock()
+        self._next = self._end = 0
+        self._pid = None
+
+    def allocate_block(self):
+        """Reserve the next block_size values; returns (start, end)."""
+        with transaction.atomic():
+            updated = OrderNumberSequence.objects.filter(name=self.sequence).update(
+                next_value=F('next_value') + self.block_size,
+            )
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        OrderNumberSequence.objects.create(name=self.sequence, next_value=1 + self.block_size)
+                except IntegrityError:
+                    # Another process created it first
+                    return self.allocate_block()
+            end = OrderNumberSequence.objects.filter(name=self.sequence).values_list('next_value', flat=True).get()
+        return end - self.block_size, end
+
+    def next_value(self):
+        with self._lock:
+            # A forked worker must not keep numbering from its parent's block
+            if self._next >= self._end or self._pid != os.getpid():
+                self._next, self._end = self.allocate_block()
+                self._pid = os.getpid()
+            value = self._next
+            self._next += 1
+            return value
+
+    def next_number(self):
+        date = timezone.localdate().strftime('%Y%m%d')
+        return f"{self.prefix}-{date}-{self.next_value():0{self.width}d}"
+
+    def reset(self):
+        with self._lock:
+            self._next = self._end = 0
+
+
+_generator = None
+
+
+def get_order_number_generator():
+    global _generator
+    if _generator is None:
+        config = getattr(settings, 'ORDER_NUMBER_GENERATOR', {})
+        backend_class = import_string(config.get('BACKEND', 'orders.numbering.BlockSequenceGenerator'))
+        _generator = backend_class(**config.get('OPTIONS', {}))
+    return _generator
+
+
+def next_order_number():
+    return get_order_number_generator().next_number()
@@ -19,12 +19,11 @@ class PaymentSerializer(serializers.ModelSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     payment = PaymentSerializer(read_only=True)
-    final_total = serializers.ReadOnlyField()
     
     class Meta:
         model = Order
         fields = '__all__'
-        read_only_fields = ('id', 'user', 'order_number', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'user', 'order_number', 'final_total', 'items_count', 'created_at', 'updated_at')
 
 class OrderCreateSerializer(serializers.Serializer):
     shipping_address_id = serializers.IntegerField()
@@ -32,12 +31,6 @@ class OrderCreateSerializer(serializers.Serializer):
     notes = serializers.CharField(required=False, allow_blank=True)
 
 class OrderListSerializer(serializers.ModelSerializer):
-    final_total = serializers.ReadOnlyField()
-    items_count = serializers.SerializerMethodField()
-    
     class Meta:
         model = Order
         fields = ('id', 'order_number', 'status', 'payment_status', 'final_total', 'items_count', 'created_at')
-        
-    def get_items_count(self, obj):
-        return obj.items.count()
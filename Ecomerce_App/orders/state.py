@@ -0,0 +1,67 @@
+"""
+Order status transitions.
+
+Every status change goes through transition(), which moves an order with
+a conditional UPDATE ... WHERE status IN (<allowed sources>). Two requests
+racing to change the same order cannot both succeed, so a double cancel
+returns stock once. Cancellations put the stock of every order that
+actually moved back in one F()-based UPDATE, in the same transaction, and
+queue a refund for those already paid.
+"""
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from jobs.queue import enqueue
+from store.inventory import return_stock
+from .models import Order, OrderItem
+
+# Target status -> statuses it may be reached from
+TRANSITIONS = {
+    'confirmed': {'pending'},
+    'shipped': {'confirmed'},
+    'delivered': {'shipped'},
+    'cancelled': {'pending', 'confirmed'},
+}
+
+
+def can_transition(status, target):
+    return status in TRANSITIONS.get(target, ())
+
+
+def restore_stock(order_ids):
+    """Return the items of `order_ids` to stock with one aggregate and one UPDATE."""
+    return_stock(dict(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values_list('product_id').annotate(total=Sum('quantity')).order_by()
+    ))
+
+
+def refund_paid(order_ids, now):
+    """Mark the paid orders among `order_ids` for refund and queue the refunds."""
+    from .tasks import refund_payment  # tasks imports this module
+
+    paid = list(Order.objects.filter(pk__in=order_ids, payment_status='paid').values_list('pk', flat=True))
+    Order.objects.filter(pk__in=paid).update(payment_status='refund_pending', updated_at=now)
+    for order_id in paid:
+        enqueue(refund_payment, order_id=order_id)
+
+
+def transition(order_ids, target, filters=None, **changes):
+    """
+    Move each order in `order_ids` to `target` if its current status allows
+    it (and it matches `filters`), also setting `changes`. Returns the ids
+    that moved; the others are left untouched.
+    """
+    sources = TRANSITIONS[target]
+    now = timezone.now()
+    with transaction.atomic():
+        moved = [
+            order_id for order_id in order_ids
+            if Order.objects.filter(pk=order_id, status__in=sources, **(filters or {})).update(
+                status=target, updated_at=now, **changes,
+            )
+        ]
+        if target == 'cancelled' and moved:
+            restore_stock(moved)
+            refund_paid(moved, now)
+    return moved
@@ -0,0 +1,93 @@
+import uuid
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+from jobs.queue import PermanentFailure, enqueue, task
+from .models import Order, Payment
+from .state import transition
+
+
+class PaymentDeclined(Exception):
+    pass
+
+
+def charge(payment, idempotency_key):
+    """
+    Capture the payment with the provider and return its transaction id.
+    The provider answers a repeated `idempotency_key` with the original
+    capture instead of charging again. Raise PaymentDeclined for a
+    definitive refusal; any other exception is treated as transient and
+    retried.
+    """
+    return f"TXN-{uuid.uuid4().hex[:12].upper()}"  # For demo purposes
+
+
+def refund(payment, idempotency_key):
+    """Return a captured payment to the customer; idempotent like charge()."""
+
+
+def fail_payment(order_id):
+    """Mark a pending payment failed and have reconcile_order_stock release the order's stock."""
+    with transaction.atomic():
+        failed = Order.objects.filter(pk=order_id, payment_status='pending').update(
+            payment_status='failed', updated_at=timezone.now(),
+        )
+        if failed:
+            enqueue(reconcile_order_stock, order_id=order_id)
+
+
+@task(queue='checkout', max_attempts=5, on_failure=fail_payment)
+def capture_payment(order_id):
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=order_id)
+        if order.status != 'pending' or order.payment_status != 'pending':
+            return  # Settled by an earlier attempt, or cancelled before capture
+        payment = Payment.objects.get(order_id=order_id)
+
+    try:
+        # Keyed on the payment: a retried or reclaimed job cannot charge twice
+        transaction_id = charge(payment, idempotency_key=f'payment-{payment.pk}')
+    except PaymentDeclined:
+        fail_payment(order_id)
+        return
+
+    with transaction.atomic():
+        # Recorded even if the order was cancelled while the charge ran
+        Payment.objects.filter(pk=payment.pk).update(is_successful=True, transaction_id=transaction_id)
+        confirmed = transition([order_id], 'confirmed', filters={'payment_status': 'pending'}, payment_status='paid')
+        if confirmed:
+            enqueue(send_order_confirmation, order_id=order_id)
+        else:
+            Order.objects.filter(pk=order_id).update(payment_status='refund_pending', updated_at=timezone.now())
+            enqueue(refund_payment, order_id=order_id)
+
+
+@task(queue='default', max_attempts=5)
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related('user').get(pk=order_id)
+    if not order.user.email:
+        raise PermanentFailure(f'User {order.user_id} has no email address')
+    send_mail(
+        subject=f'Order {order.order_number} confirmed',
+        message=f'Thank you for your order. Total: {order.final_total}',
+        from_email=None,
+        recipient_list=[order.user.email],
+    )
+
+
+@task(queue='checkout', max_attempts=10)
+def reconcile_order_stock(order_id):
+    """Cancel an order whose payment failed and put its stock back, once."""
+    transition([order_id], 'cancelled', filters={'payment_status': 'failed'})
+
+
+@task(queue='checkout', max_attempts=10)
+def refund_payment(order_id):
+    """Refund the captured payment of a cancelled order, once."""
+    if not Order.objects.filter(pk=order_id, payment_status='refund_pending').exists():
+        return
+    payment = Payment.objects.get(order_id=order_id)
+    refund(payment, idempotency_key=f'refund-{payment.pk}')
+    Order.objects.filter(pk=order_id, payment_status='refund_pending').update(
+        payment_status='refunded', updated_at=timezone.now(),
+    )
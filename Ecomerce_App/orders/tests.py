@@ -1,3 +1,475 @@
-from django.test import TestCase
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+from django.core import mail
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from cart.models import Cart, CartItem
+from ecommerce_project.testing import QueryBudgetMixin
+from store.inventory import find_shortages
+from store.models import Category, Product
+from users.models import Address, CustomUser
+from jobs.models import Job
+from jobs.queue import run_pending
+from .models import Order, OrderItem, Payment
+from .numbering import BlockSequenceGenerator, get_order_number_generator, next_order_number
+from .state import transition
+from .serializers import OrderSerializer
+from .tasks import PaymentDeclined
 
-# Create your tests here.
+
+class CheckoutFixturesMixin:
+    def make_buyer(self, username):
+        user = CustomUser.objects.create(username=username, email=f'{username}@example.com')
+        address = Address.objects.create(
+            user=user, street_address='1 Main St', city='Springfield',
+            state='IL', postal_code='62701', country='US', is_default=True,
+        )
+        return user, address
+
+    def fill_cart(self, user, *lines):
+        cart, created = Cart.objects.get_or_create(user=user)
+        for product, quantity in lines:
+            CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+        return cart
+
+    def checkout(self, client, address):
+        return client.post('/api/orders/create/', {
+            'shipping_address_id': address.pk,
+            'payment_method': 'credit_card',
+        }, format='json')
+
+
+class OrderTestCase(CheckoutFixturesMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user, self.address = self.make_buyer('buyer')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Books')
+
+    def make_product(self, name, price='10.00', stock=10):
+        return Product.objects.create(
+            name=name, description=name, price=Decimal(price), category=self.category, stock_quantity=stock,
+        )
+
+    def make_order(self, number, **kwargs):
+        kwargs.setdefault('total_amount', Decimal('10.00'))
+        return Order.objects.create(user=self.user, order_number=number, shipping_address=self.address, **kwargs)
+
+
+class OrderListPaginationTests(OrderTestCase):
+    def test_opt_in_cursor(self):
+        for i in range(25):
+            self.make_order(f'ORD-{i:04d}')
+
+        first = self.client.get('/api/orders/', {'pagination': 'cursor'}).data
+        self.assertNotIn('count', first)
+        self.assertEqual(first['results'][0]['order_number'], 'ORD-0024')
+
+        second = self.client.get(first['next']).data
+        self.assertIsNone(second['next'])
+        numbers = [order['order_number'] for order in first['results'] + second['results']]
+        self.assertEqual(numbers, [f'ORD-{i:04d}' for i in reversed(range(25))])
+
+    def test_page_numbers_remain_default(self):
+        self.make_order('ORD-0001')
+        data = self.client.get('/api/orders/').data
+        self.assertEqual(data['count'], 1)
+
+    def test_history_is_paginated_and_reads_only_the_order_table(self):
+        for i in range(25):
+            self.make_order(f'ORD-{i:04d}', shipping_cost=Decimal('5.00'), items_count=i)
+
+        with CaptureQueriesContext(connection) as context:
+            data = self.client.get('/api/orders/history/', {'pagination': 'cursor'}).data
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('orders_orderitem', context.captured_queries[0]['sql'])
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['results'][0]['items_count'], 24)
+        self.assertEqual(data['results'][0]['final_total'], '15.00')
+        self.assertEqual(self.client.get('/api/orders/history/').data['count'], 25)
+
+    def test_checkout_records_items_count_and_final_total(self):
+        self.fill_cart(self.user, (self.make_product('A'), 2), (self.make_product('B'), 1))
+        self.assertEqual(self.checkout(self.client, self.address).status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.items_count, 2)
+        self.assertEqual(order.final_total, Decimal('42.40'))
+
+
+class OrderDetailConditionalGetTests(OrderTestCase):
+    def test_etag_round_trip(self):
+        order = self.make_order('ORD-0001')
+        url = f'/api/orders/{order.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        order.status = 'shipped'
+        order.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_other_users_order_is_not_found(self):
+        other = CustomUser.objects.create(username='other', email='other@example.com')
+        order = Order.objects.create(
+            user=other, order_number='ORD-0002', shipping_address=self.address, total_amount=Decimal('1.00'),
+        )
+        self.assertEqual(self.client.get(f'/api/orders/{order.pk}/').status_code, 404)
+
+
+class CreateOrderStockTests(OrderTestCase):
+    def test_checkout_takes_stock(self):
+        book = self.make_product('Book', stock=5)
+        pen = self.make_product('Pen', price='2.50', stock=3)
+        self.fill_cart(self.user, (book, 2), (pen, 3))
+
+        response = self.checkout(self.client, self.address)
+        self.assertEqual(response.status_code, 201, response.data)
+        book.refresh_from_db()
+        pen.refresh_from_db()
+        self.assertEqual((book.stock_quantity, pen.stock_quantity), (3, 0))
+        self.assertEqual(response.data['order']['total_amount'], '27.50')
+        self.assertEqual(response.data['order']['tax_amount'], '2.20')
+
+    def test_shortage_rolls_back_whole_order(self):
+        book = self.make_product('Book', stock=5)
+        pen = self.make_product('Pen', stock=1)
+        cart = self.fill_cart(self.user, (book, 2), (pen, 3))
+
+        response = self.checkout(self.client, self.address)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['shortages'], [
+            {'product_id': pen.pk, 'name': 'Pen', 'requested': 3, 'available': 1},
+        ])
+        book.refresh_from_db()
+        self.assertEqual(book.stock_quantity, 5)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(cart.items.count(), 2)
+
+    def test_restock_after_a_failed_update_is_taken_not_refused(self):
+        pen = self.make_product('Pen', stock=1)
+        self.fill_cart(self.user, (pen, 3))
+
+        def restocked_first(*args, **kwargs):
+            # Another transaction restocks between the UPDATE and the re-check
+            Product.objects.filter(pk=pen.pk).update(stock_quantity=10)
+            return find_shortages(*args, **kwargs)
+
+        with mock.patch('store.inventory.find_shortages', side_effect=restocked_first):
+            response = self.checkout(self.client, self.address)
+        self.assertEqual(response.status_code, 201)
+        pen.refresh_from_db()
+        self.assertEqual(pen.stock_quantity, 7)
+
+
+class CheckoutQueryCountTests(OrderTestCase):
+    def checkout_queries(self, lines):
+        products = [self.make_product(f'Item {lines}-{i}') for i in range(lines)]
+        self.fill_cart(self.user, *((product, 1) for product in products))
+        # Start from a fresh number block so no allocation lands in the count
+        get_order_number_generator().reset()
+        next_order_number()
+        with CaptureQueriesContext(connection) as context:
+            response = self.checkout(self.client, self.address)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['order']['items']), lines)
+        # The cart, the address and the cart lines with their products; the
+        # response is built from the rows just written
+        reads = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(reads), 3, '\n'.join(reads))
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_items(self):
+        self.assertEqual(self.checkout_queries(1), self.checkout_queries(10))
+
+    def test_response_lists_the_created_items(self):
+        first, second = self.make_product('First'), self.make_product('Second', price='4.50')
+        self.fill_cart(self.user, (first, 2), (second, 1))
+        items = self.checkout(self.client, self.address).data['order']['items']
+        order = Order.objects.for_detail().get()
+        self.assertEqual(items, OrderSerializer(order).data['items'])
+
+
+class OrderDetailQueryTests(QueryBudgetMixin, OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.make_order('ORD-0001')
+        Payment.objects.create(order=self.order, payment_method='credit_card', amount=Decimal('10.00'))
+        self.add_lines()
+
+    def add_lines(self, count=3):
+        OrderItem.objects.bulk_create(
+            OrderItem(order=self.order, product=self.make_product(f'Item {i}'), quantity=1, price=Decimal('10.00'))
+            for i in range(self.order.items.count(), self.order.items.count() + count)
+        )
+
+    def test_detail_queries_do_not_grow_with_lines(self):
+        def get():
+            response = self.client.get(f'/api/orders/{self.order.pk}/')
+            self.assertEqual(response.status_code, 200)
+        # Validators, order with payment, items with products
+        self.assertConstantQueries(get, self.add_lines, limit=3)
+
+
+class OrderStateTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.make_product('Clean Code', stock=5)
+        self.order = self.make_order('ORD-0001', payment_status='paid')
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=Decimal('10.00'))
+
+    def cancel(self, order=None):
+        return self.client.put(f'/api/orders/{(order or self.order).pk}/cancel/')
+
+    def test_cancel_restocks_once(self):
+        response = self.cancel()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order']['status'], 'cancelled')
+        self.assertEqual(self.cancel().data, {'error': 'Order is already cancelled'})
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 7)
+
+    def test_cancelling_a_paid_order_refunds_it(self):
+        Payment.objects.create(order=self.order, payment_method='credit_card', amount=Decimal('20.00'), is_successful=True)
+        self.assertEqual(self.cancel().data['order']['payment_status'], 'refund_pending')
+        self.assertEqual(Job.objects.get().task, 'orders.tasks.refund_payment')
+        with mock.patch('orders.tasks.refund') as refund:
+            run_pending(['checkout'])
+        refund.assert_called_once()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'refunded')
+
+    def test_order_awaiting_capture_can_be_cancelled(self):
+        order = self.make_order('ORD-0002')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('10.00'))
+        response = self.cancel(order)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order']['payment_status'], 'pending')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 6)
+
+    def test_shipped_order_cannot_be_cancelled(self):
+        self.assertEqual(transition([self.order.pk], 'confirmed'), [self.order.pk])
+        self.assertEqual(transition([self.order.pk], 'shipped'), [self.order.pk])
+        self.assertEqual(self.cancel().status_code, 400)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 5)
+
+    def test_bulk_transition_skips_disallowed_orders(self):
+        confirmed = self.make_order('ORD-0002', status='confirmed')
+        self.assertEqual(transition([self.order.pk, confirmed.pk], 'shipped'), [confirmed.pk])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+
+    def test_cancel_queries_do_not_grow_with_lines(self):
+        def cancel_queries(lines):
+            order = self.make_order(f'ORD-L{lines}', payment_status='paid')
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=self.make_product(f'Item {lines}-{i}'), quantity=1, price=Decimal('1.00'))
+                for i in range(lines)
+            )
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.cancel(order).status_code, 200)
+            return len(context.captured_queries)
+        self.assertEqual(cancel_queries(1), cancel_queries(10))
+
+
+class CheckoutPipelineTests(OrderTestCase):
+    def place(self, stock=5, quantity=2):
+        product = self.make_product('Clean Code', stock=stock)
+        self.fill_cart(self.user, (product, quantity))
+        response = self.checkout(self.client, self.address)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['order']['status'], 'pending')
+        return product, Order.objects.get(pk=response.data['order']['id'])
+
+    def test_worker_captures_payment_and_confirms(self):
+        product, order = self.place()
+        self.assertEqual(order.payment_status, 'pending')
+        self.assertEqual(Job.objects.get().task, 'orders.tasks.capture_payment')
+
+        run_pending(['checkout', 'default'])
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.payment_status), ('confirmed', 'paid'))
+        self.assertTrue(order.payment.is_successful)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(order.order_number, mail.outbox[0].subject)
+        self.assertFalse(Job.objects.exists())
+
+    def test_declined_payment_cancels_and_restocks(self):
+        product, order = self.place()
+        with mock.patch('orders.tasks.charge', side_effect=PaymentDeclined):
+            run_pending(['checkout'])
+        run_pending(['checkout'])
+
+        order.refresh_from_db()
+        product.refresh_from_db()
+        self.assertEqual((order.status, order.payment_status), ('cancelled', 'failed'))
+        self.assertEqual(product.stock_quantity, 5)
+        self.assertFalse(Job.objects.exists())
+
+    def test_capture_failing_on_its_last_attempt_cancels_and_restocks(self):
+        product, order = self.place()
+        with mock.patch('orders.tasks.charge', side_effect=ConnectionError('provider unreachable')):
+            for attempt in range(5):
+                order.refresh_from_db()
+                self.assertEqual(order.payment_status, 'pending')
+                Job.objects.update(run_at=timezone.now())
+                run_pending(['checkout'])
+        capture = Job.objects.get(task='orders.tasks.capture_payment')
+        self.assertEqual((capture.status, capture.attempts), ('failed', 5))
+
+        run_pending(['checkout'])
+        order.refresh_from_db()
+        product.refresh_from_db()
+        self.assertEqual((order.status, order.payment_status), ('cancelled', 'failed'))
+        self.assertEqual(product.stock_quantity, 5)
+
+    def test_decline_changes_the_detail_etag(self):
+        product, order = self.place()
+        url = f'/api/orders/{order.pk}/'
+        etag = self.client.get(url)['ETag']
+        placed_at = order.updated_at
+        with mock.patch('orders.tasks.charge', side_effect=PaymentDeclined):
+            run_pending(['checkout'])
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, 'failed')
+        self.assertGreater(order.updated_at, placed_at)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_order_cancelled_before_capture_is_not_charged(self):
+        product, order = self.place()
+        transition([order.pk], 'cancelled')
+        with mock.patch('orders.tasks.charge') as charge:
+            run_pending(['checkout'])
+        charge.assert_not_called()
+        self.assertFalse(Job.objects.exists())
+
+    def test_charge_racing_a_cancel_is_recorded_and_refunded(self):
+        product, order = self.place()
+
+        def charge(payment, idempotency_key):
+            self.assertEqual(idempotency_key, f'payment-{payment.pk}')
+            transition([order.pk], 'cancelled')
+            return 'TXN-RACE'
+
+        with mock.patch('orders.tasks.charge', side_effect=charge):
+            run_pending(['checkout'])
+        self.assertEqual(Order.objects.get(pk=order.pk).payment_status, 'refund_pending')
+        with mock.patch('orders.tasks.refund') as refund:
+            run_pending(['checkout'])
+        refund.assert_called_once()
+
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.payment_status), ('cancelled', 'refunded'))
+        self.assertEqual(order.payment.transaction_id, 'TXN-RACE')
+        self.assertTrue(order.payment.is_successful)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class OrderNumberTests(OrderTestCase):
+    def test_numbers_are_sortable_and_unique_across_processes(self):
+        worker_a = BlockSequenceGenerator(block_size=3)
+        worker_b = BlockSequenceGenerator(block_size=3)
+        first = [worker_a.next_number()]
+        with self.assertNumQueries(0):
+            first += [worker_a.next_number() for i in range(2)]
+        second = [worker_b.next_number() for i in range(3)]
+        third = [worker_a.next_number() for i in range(3)]
+
+        numbers = first + second + third
+        self.assertEqual(len(set(numbers)), 9)
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertRegex(first[0], r'^ORD-\d{8}-\d{10}$')
+
+    def test_checkout_retries_on_number_collision(self):
+        product = self.make_product('Clean Code')
+        generator = get_order_number_generator()
+        generator.reset()
+        taken = next_order_number()
+        self.make_order(taken)
+        # Hand the same number out again, as a duplicated block would
+        generator._next -= 1
+
+        self.fill_cart(self.user, (product, 1))
+        response = self.checkout(self.client, self.address)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.data['order']['order_number'], taken)
+
+    def test_block_rolled_back_with_an_idempotent_checkout_is_redrawn(self):
+        product = self.make_product('Clean Code')
+        generator = get_order_number_generator()
+        generator.reset()
+        self.fill_cart(self.user, (product, 1))
+        self.client.raise_request_exception = False
+        with mock.patch('orders.checkout.take_stock', side_effect=RuntimeError):
+            failed = self.client.post('/api/orders/create/', {
+                'shipping_address_id': self.address.pk, 'payment_method': 'credit_card',
+            }, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(failed.status_code, 500)
+
+        # The allocation was rolled back, so another process gets the same block
+        other = BlockSequenceGenerator(prefix=generator.prefix, block_size=generator.block_size)
+        taken = [other.next_number() for i in range(2)]
+        for number in taken:
+            self.make_order(number)
+
+        with mock.patch.object(generator, 'reset', wraps=generator.reset) as reset:
+            response = self.checkout(self.client, self.address)
+        reset.assert_called_once()
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn(response.data['order']['order_number'], taken)
+
+
+class ConcurrentCheckoutTests(CheckoutFixturesMixin, TransactionTestCase):
+    buyers = 6
+    stock = 2
+
+    def test_parallel_checkouts_never_oversell(self):
+        product = Product.objects.create(
+            name='Limited', description='Limited run', price=Decimal('5.00'),
+            category=Category.objects.create(name='Drops'), stock_quantity=self.stock,
+        )
+        sessions = []
+        for i in range(self.buyers):
+            user, address = self.make_buyer(f'buyer{i}')
+            self.fill_cart(user, (product, 1))
+            client = APIClient()
+            client.force_authenticate(user)
+            sessions.append((client, address))
+
+        barrier = threading.Barrier(self.buyers)
+        statuses = []
+
+        def buy(client, address):
+            # Retry transient failures the way a client would. SQLite's
+            # shared-cache test database reports lock contention as an
+            # error instead of waiting for the lock.
+            try:
+                barrier.wait()
+                for attempt in range(100):
+                    try:
+                        status_code = self.checkout(client, address).status_code
+                    except OperationalError:
+                        status_code = None
+                    # 400 means an earlier attempt committed and emptied the cart
+                    if status_code in (201, 400, 409):
+                        break
+                    time.sleep(0.01)
+                statuses.append(status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=session) for session in sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 0)
+        self.assertEqual(Order.objects.count(), self.stock)
+        self.assertEqual(statuses.count(409), self.buyers - self.stock, statuses)
@@ -0,0 +1,103 @@
+"""Async versions of the hot catalog reads (see ecommerce_project/asyncapi.py)."""
+from asgiref.sync import sync_to_async
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters
+from rest_framework.exceptions import NotFound, ValidationError
+from ecommerce_project.asyncapi import (
+    Fallback, apaginate, async_read_view, drf_request, json_response, wants_cursor,
+)
+from ecommerce_project.conditional import aaggregate_validators, aconditional_get
+from . import search, views
+from .cache import acache_anonymous_get
+from .models import Product
+from .pagination import NewestFirstCursorPagination, RankedCursorPagination
+from .serializers import ProductListSerializer, ProductSerializer
+from .streaming import wants_stream
+
+
+async def filter_products(request, queryset):
+    """
+    ProductListView's filter backends. Search and ordering build querysets
+    without touching the database; the view's filterset validates its
+    params against the database, so it runs in a thread, and only when
+    one of them is present.
+    """
+    request = drf_request(request)
+    view = views.ProductListView(request=request, kwargs={}, format_kwarg=None)
+    backend = DjangoFilterBackend()
+    filterset_class = backend.get_filterset_class(view, queryset)
+    if any(name in request.query_params for name in filterset_class.base_filters):
+        try:
+            queryset = await sync_to_async(backend.filter_queryset)(request, queryset, view)
+        except ValidationError:
+            raise Fallback  # DRF renders the errors
+    queryset = filters.SearchFilter().filter_queryset(request, queryset, view)
+    return filters.OrderingFilter().filter_queryset(request, queryset, view)
+
+
+@async_read_view(views.ProductListView.as_view(), allow='GET, POST, HEAD, OPTIONS')
+@acache_anonymous_get('product-list', views.catalog_namespaces, timeout=60)
+async def product_list(request):
+    if wants_cursor(request):
+        raise Fallback
+    queryset = await filter_products(request, Product.objects.active().for_listing())
+    validators = await aaggregate_validators(queryset, 'updated_at', 'category__updated_at')
+
+    async def build():
+        products, links = await apaginate(request, queryset)
+        serializer = ProductListSerializer(products, many=True, context={'request': request})
+        return json_response({**links, 'results': serializer.data})
+    return await aconditional_get(request, validators, build)
+
+
+@async_read_view(views.ProductDetailView.as_view(), allow='GET, PUT, PATCH, DELETE, HEAD, OPTIONS')
+@acache_anonymous_get('product-detail', views.product_detail_namespaces, timeout=300)
+async def product_detail(request, pk):
+    row = await Product.objects.active().filter(pk=pk).values_list('updated_at', 'category__updated_at').afirst()
+    if row is None:
+        raise Fallback
+
+    async def build():
+        product = await Product.objects.active().for_detail().filter(pk=pk).afirst()
+        if product is None:
+            raise Fallback
+        return json_response(ProductSerializer(product, context={'request': request}).data)
+    return await aconditional_get(request, (row, max(row)), build)
+
+
+@async_read_view(views.featured_products)
+@acache_anonymous_get('featured-products', views.catalog_namespaces, timeout=300)
+async def featured_products(request):
+    if wants_stream(drf_request(request)):
+        raise Fallback
+    paginator = NewestFirstCursorPagination()
+    try:
+        page = await sync_to_async(paginator.paginate_queryset)(
+            Product.objects.active().for_listing(), drf_request(request),
+        )
+    except NotFound:
+        raise Fallback
+    serializer = ProductListSerializer(page, many=True, context={'request': request})
+    return json_response(paginator.get_paginated_response(serializer.data).data)
+
+
+@async_read_view(views.search_products)
+@acache_anonymous_get('search-products', views.catalog_namespaces, timeout=60)
+async def search_products(request):
+    if wants_stream(drf_request(request)):
+        raise Fallback
+    query = request.GET.get('q', '').strip()
+    paginator = RankedCursorPagination()
+
+    def fetch():
+        hits = paginator.paginate_hits(
+            lambda limit, after: search.search_hits(query, limit, after), drf_request(request)
+        )
+        return search.load_products([product_id for product_id, score in hits])
+
+    try:
+        products = await sync_to_async(fetch)()
+    except NotFound:
+        raise Fallback
+    serializer = ProductListSerializer(products, many=True, context={'request': request})
+    return json_response(paginator.get_paginated_response(serializer.data).data)
@@ -0,0 +1,249 @@
+"""
+Response cache for anonymous catalog reads.
+
+Anonymous GETs on the store endpoints are cached as rendered responses.
+Each cached view declares the namespaces its payload depends on (e.g.
+"products" or "product:42"); every namespace has a generation number that
+is part of the cache key, and store.signals bumps the generations when a
+Product, Category, ProductImage or Review changes. Stale entries are never
+read again and simply age out of the backend. Every key also carries the
+generation of the ALL namespace, which clear() bumps, so clearing never
+touches other keys of a shared cache.
+
+Configure with the STORE_RESPONSE_CACHE setting:
+
+    STORE_RESPONSE_CACHE = {
+        'BACKEND': 'store.cache.LocalLRUBackend',   # or DjangoCacheBackend
+        'OPTIONS': {'max_entries': 1024},
+        'TIMEOUTS': {'product-list': 30},            # per-view TTL overrides
+    }
+
+LocalLRUBackend is per process, so invalidations only reach the process
+that saw the change; use DjangoCacheBackend with a shared cache (Redis,
+Memcached) when running several workers.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date
+from django.utils.module_loading import import_string
+
+CACHED_HEADERS = ('Content-Type', 'Vary', 'Allow', 'ETag', 'Last-Modified')
+
+
+class LocalLRUBackend:
+    """Bounded in-process LRU with a per-entry expiry time."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """Shared backend storing entries in one of the configured CACHES."""
+
+    def __init__(self, alias='default', key_prefix='store-response'):
+        self.cache = caches[alias]
+        self.key_prefix = key_prefix
+
+    def make_key(self, key):
+        return f'{self.key_prefix}:{key}'
+
+    def get(self, key):
+        return self.cache.get(self.make_key(key))
+
+    def set(self, key, value, timeout):
+        self.cache.set(self.make_key(key), value, timeout)
+
+
+# Generation keys outlive any response entry
+GENERATION_TIMEOUT = 60 * 60 * 24 * 30
+# Namespace every cached response depends on
+ALL = '*'
+
+
+class ResponseCache:
+    def __init__(self, backend, timeouts=None):
+        self.backend = backend
+        self.timeouts = timeouts or {}
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def generation(self, namespace):
+        key = f'gen:{namespace}'
+        value = self.backend.get(key)
+        if value is None:
+            # A fresh value (not 0) so an evicted generation can never
+            # resurrect entries written under an older one.
+            value = time.time_ns()
+            self.backend.set(key, value, GENERATION_TIMEOUT)
+        return value
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.set(f'gen:{namespace}', time.time_ns(), GENERATION_TIMEOUT)
+
+    def key_for(self, name, namespaces, request):
+        generations = ','.join(f'{ns}={self.generation(ns)}' for ns in (ALL, *namespaces))
+        raw = '|'.join((name, generations, request.get_full_path(), request.META.get('HTTP_ACCEPT', '')))
+        return 'resp:' + hashlib.sha256(raw.encode()).hexdigest()
+
+    def record(self, name, outcome):
+        with self._stats_lock:
+            self.stats[(name, outcome)] += 1
+
+    def get_stats(self):
+        with self._stats_lock:
+            views = {}
+            for (name, outcome), count in self.stats.items():
+                views.setdefault(name, {'hits': 0, 'misses': 0})[outcome] = count
+            return views
+
+    def clear(self):
+        """Orphan every cached response and reset the counters."""
+        self.invalidate(ALL)
+        with self._stats_lock:
+            self.stats.clear()
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        config = getattr(settings, 'STORE_RESPONSE_CACHE', {})
+        backend_class = import_string(config.get('BACKEND', 'store.cache.LocalLRUBackend'))
+        _response_cache = ResponseCache(
+            backend_class(**config.get('OPTIONS', {})),
+            timeouts=config.get('TIMEOUTS', {}),
+        )
+    return _response_cache
+
+
+def invalidate(*namespaces):
+    """
+    Bump namespace generations right away and again once the transaction
+    commits, so a concurrent read cannot re-cache pre-commit data under the
+    new generation.
+    """
+    cache = get_response_cache()
+    cache.invalidate(*namespaces)
+    transaction.on_commit(lambda: cache.invalidate(*namespaces))
+
+
+def is_cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and 'HTTP_AUTHORIZATION' not in request.META
+        and not request.user.is_authenticated
+        and 'stream' not in request.GET
+    )
+
+
+def cached_response(cache, name, key, request):
+    """The stored response for key as an HttpResponse (or 304), or None."""
+    entry = cache.backend.get(key)
+    if entry is None:
+        return None
+    cache.record(name, 'hits')
+    status_code, content, headers = entry
+    last_modified = headers.get('Last-Modified')
+    response = get_conditional_response(
+        request,
+        etag=headers.get('ETag'),
+        last_modified=parse_http_date(last_modified) if last_modified else None,
+    ) or HttpResponse(content, status=status_code)
+    for header, value in headers.items():
+        response[header] = value
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def store_response(cache, name, key, response, timeout):
+    cache.record(name, 'misses')
+    if response.status_code == 200 and not response.streaming:
+        if hasattr(response, 'render'):
+            response.render()
+        headers = {h: response[h] for h in CACHED_HEADERS if h in response}
+        cache.backend.set(
+            key, (response.status_code, response.content, headers),
+            cache.timeouts.get(name, timeout),
+        )
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def cache_anonymous_get(name, namespaces, timeout=60):
+    """
+    Cache rendered responses of a view for anonymous GET requests.
+
+    `namespaces` is a callable receiving the view kwargs and returning the
+    invalidation namespaces the response depends on. The TTL defaults to
+    `timeout` and can be overridden per view name in settings.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view(request, *args, **kwargs)
+
+            cache = get_response_cache()
+            key = cache.key_for(name, namespaces(kwargs), request)
+            response = cached_response(cache, name, key, request)
+            if response is not None:
+                return response
+            return store_response(cache, name, key, view(request, *args, **kwargs), timeout)
+        return wrapped
+    return decorator
+
+
+def acache_anonymous_get(name, namespaces, timeout=60):
+    """
+    cache_anonymous_get() for async views. Entries are shared with the sync
+    view of the same name; request.user must already be resolved.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return await view(request, *args, **kwargs)
+
+            cache = get_response_cache()
+            key = cache.key_for(name, namespaces(kwargs), request)
+            response = cached_response(cache, name, key, request)
+            if response is not None:
+                return response
+            return store_response(cache, name, key, await view(request, *args, **kwargs), timeout)
+        return wrapped
+    return decorator
@@ -0,0 +1,50 @@
+from ecommerce_project.hot_queries import detail_queryset, hot_query, view_queryset
+from .search import InvertedIndexBackend
+from .views import ProductDetailView, ProductListView, ProductReviewListView
+
+
+@hot_query('product-list')
+def product_list():
+    return view_queryset(ProductListView)
+
+
+@hot_query('product-list-cursor')
+def product_list_cursor():
+    return view_queryset(ProductListView, 'pagination=cursor')
+
+
+@hot_query('product-list-by-price')
+def product_list_by_price():
+    return view_queryset(ProductListView, 'pagination=cursor&ordering=price')
+
+
+# The category filter is applied by hand: the view's filterset would look
+# the category up, and EXPLAIN must not depend on the rows present
+@hot_query('product-list-category')
+def product_list_category():
+    return view_queryset(ProductListView, 'pagination=cursor', filters={'category_id': 1})
+
+
+@hot_query('product-list-category-by-price')
+def product_list_category_by_price():
+    return view_queryset(ProductListView, 'pagination=cursor&ordering=price', filters={'category_id': 1})
+
+
+@hot_query('product-list-category-price')
+def product_list_category_price():
+    return view_queryset(ProductListView, 'pagination=cursor&price=10', filters={'category_id': 1})
+
+
+@hot_query('product-detail')
+def product_detail():
+    return detail_queryset(ProductDetailView)
+
+
+@hot_query('product-reviews')
+def product_reviews():
+    return view_queryset(ProductReviewListView, product_pk=1)
+
+
+@hot_query('search-postings')
+def search_postings():
+    return InvertedIndexBackend().postings(['clean'], 'boo').values('product_id', 'weight')
@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from .cache import invalidate
+from .models import Product
+
+
+class InsufficientStock(Exception):
+    """Raised when one or more products cannot cover the requested quantity."""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(', '.join(
+            f"{item['name']} (requested {item['requested']}, available {item['available']})"
+            for item in shortages
+        ))
+
+
+def take_stock(quantities, held=None):
+    """
+    Decrement stock for {product_id: quantity} without overselling.
+
+    All products are decremented by one conditional statement:
+
+        UPDATE product SET stock_quantity = stock_quantity - CASE id ... END
+        WHERE id IN (...) AND stock_quantity >= CASE id ... END
+
+    so concurrent checkouts cannot both take the last unit. If fewer rows
+    than requested were updated, the savepoint is rolled back (no stock is
+    taken at all) and InsufficientStock lists every short item, read again
+    with the rows locked.
+
+    `held` is an optional per-product expression for units that are spoken
+    for elsewhere (e.g. other carts' reservations); they are excluded from
+    what this call may take.
+    """
+    if not quantities:
+        return
+
+    requested = Case(
+        *(When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()),
+        output_field=IntegerField(),
+    )
+    needed = requested + held if held is not None else requested
+    with transaction.atomic():
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    updated = Product.objects.filter(
+                        pk__in=quantities, is_active=True, stock_quantity__gte=needed,
+                    ).update(stock_quantity=F('stock_quantity') - requested, updated_at=timezone.now())
+                    if updated != len(quantities):
+                        raise InsufficientStock([])
+                break
+            except InsufficientStock:
+                # Other transactions may have changed stock since the UPDATE.
+                # Read it again with the rows locked, so what is reported is
+                # what a retry would see; if it all fits now, retry once.
+                shortages = find_shortages(quantities, held, lock=True)
+                if shortages or attempt:
+                    raise InsufficientStock(shortages)
+
+    invalidate('products', *(f'product:{product_id}' for product_id in quantities))
+
+
+def return_stock(quantities):
+    """Add {product_id: quantity} back to stock with one UPDATE."""
+    if not quantities:
+        return
+    returned = Case(
+        *(When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()),
+        output_field=IntegerField(),
+    )
+    Product.objects.filter(pk__in=quantities).update(
+        stock_quantity=F('stock_quantity') + returned, updated_at=timezone.now(),
+    )
+    invalidate('products', *(f'product:{product_id}' for product_id in quantities))
+
+
+def find_shortages(quantities, held=None, lock=False):
+    """
+    Describe the products that cannot cover {product_id: quantity}. With
+    `lock`, the product rows stay locked until the transaction ends.
+    """
+    sellable = F('stock_quantity') - held if held is not None else F('stock_quantity')
+    products = Product.objects.select_for_update() if lock else Product.objects
+    products = {
+        product['id']: product
+        for product in products.filter(pk__in=quantities).values('id', 'name', 'is_active', available=sellable)
+    }
+    shortages = []
+    for product_id, quantity in sorted(quantities.items()):
+        product = products.get(product_id)
+        available = max(product['available'], 0) if product and product['is_active'] else 0
+        if available < quantity:
+            shortages.append({
+                'product_id': product_id,
+                'name': product['name'] if product else '',
+                'requested': quantity,
+                'available': available,
+            })
+    return shortages
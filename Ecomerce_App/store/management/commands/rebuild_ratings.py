@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from store.models import Product
+from store.ratings import rebuild_ratings
+
+class Command(BaseCommand):
+    help = 'Recompute the stored rating aggregates on every product from its reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of products to update per statement',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+        updated = 0
+
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            updated += rebuild_ratings(Product.objects.filter(pk__in=batch))
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ratings for {updated} products'))
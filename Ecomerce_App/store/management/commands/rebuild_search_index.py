@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from store.search import get_search_backend
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from the catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of products to index per batch',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        indexed = backend.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} products with {type(backend).__name__}'
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:07
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Review = apps.get_model('store', 'Review')
+    totals = Review.objects.values('product_id').annotate(c=Count('id'), s=Sum('rating'))
+    for row in totals.iterator():
+        Product.objects.filter(pk=row['product_id']).update(rating_count=row['c'], rating_sum=row['s'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
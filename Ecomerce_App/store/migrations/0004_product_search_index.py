@@ -0,0 +1,92 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:09
+
+import django.db.models.deletion
+import re
+from collections import Counter
+from django.db import OperationalError, migrations, models
+
+FTS_TABLE = 'store_product_fts'
+
+# Frozen copy of the store.search tokenizer and weights this index was
+# first built with; later changes there must not change what this
+# migration does. `manage.py rebuild_search_index` applies the current ones.
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOPWORDS = frozenset({'a', 'an', 'and', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'})
+MAX_TOKEN_LENGTH = 64
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TOKEN_LENGTH]
+        for token in TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+def create_fts_table(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    except OperationalError:
+        # SQLite built without FTS5; store.search falls back to ProductSearchTerm
+        return False
+    return True
+
+
+def build_index(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    ProductSearchTerm = apps.get_model('store', 'ProductSearchTerm')
+
+    if create_fts_table(schema_editor):
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+            f"SELECT id, name, description FROM store_product WHERE is_active"
+        )
+        return
+
+    postings = []
+    for product in Product.objects.filter(is_active=True).iterator():
+        weights = Counter()
+        for token in tokenize(product.name):
+            weights[token] += NAME_WEIGHT
+        for token in tokenize(product.description):
+            weights[token] += DESCRIPTION_WEIGHT
+        postings.extend(
+            ProductSearchTerm(term=term, product_id=product.pk, weight=weight)
+            for term, weight in weights.items()
+        )
+    ProductSearchTerm.objects.bulk_create(postings, batch_size=1000)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='store.product')),
+            ],
+            options={
+                'unique_together': {('term', 'product')},
+            },
+        ),
+        migrations.RunPython(build_index, drop_fts_table),
+    ]
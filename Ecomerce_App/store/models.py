@@ -7,6 +7,7 @@ class Category(models.Model):
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -14,6 +15,23 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+ACTIVE = models.Q(is_active=True)
+
+class ProductQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(ACTIVE)
+
+    def for_listing(self):
+        """Everything ProductListSerializer reads, in a single query."""
+        return self.select_related('category')
+
+    def for_detail(self):
+        """Everything ProductSerializer reads, in a fixed number of queries."""
+        return self.select_related('category').prefetch_related(
+            'images',
+            models.Prefetch('reviews', queryset=Review.objects.select_related('user')),
+        )
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField()
@@ -22,9 +40,28 @@ class Product(models.Model):
     stock_quantity = models.PositiveIntegerField(default=0)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Listings only show active products. filter(is_active=True) compiles
+        # to a bare WHERE "is_active", which SQLite cannot match against an
+        # index column, so the condition goes in partial indexes instead.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='product_active_newest_idx', condition=ACTIVE),
+            models.Index(fields=['price', 'id'], name='product_active_price_idx', condition=ACTIVE),
+            # Category pages by date or price (?category=&ordering=price, ?category=&price=)
+            models.Index(fields=['category', '-created_at', '-id'], name='product_category_newest_idx', condition=ACTIVE),
+            models.Index(fields=['category', 'price', 'id'], name='product_category_price_idx', condition=ACTIVE),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(price__gte=0), name='product_price_non_negative'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -34,9 +71,9 @@ class Product(models.Model):
 
     @property
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return sum([review.rating for review in reviews]) / len(reviews)
+        # Served from the denormalized aggregates kept current by store.ratings
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
         return 0
 
 class ProductImage(models.Model):
@@ -57,6 +94,24 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('product', 'user')
+        indexes = [
+            models.Index(fields=['product', '-created_at', '-id'], name='review_product_newest_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(rating__gte=1, rating__lte=5), name='review_rating_range'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name} ({self.rating}/5)"
+
+class ProductSearchTerm(models.Model):
+    """Inverted index row used by the portable search backend (store.search)."""
+    term = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('term', 'product')
+
+    def __str__(self):
+        return f"{self.term} -> {self.product_id} ({self.weight})"
@@ -0,0 +1,57 @@
+from base64 import b64decode, b64encode
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class NewestFirstCursorPagination(CursorPagination):
+    """Cursor pagination over the newest products first, without COUNT(*)."""
+    ordering = ('-created_at', '-id')
+
+
+class RankedCursorPagination(BasePagination):
+    """
+    Forward-only keyset pagination for ranked search hits.
+
+    Hits are (product_id, score) pairs fetched through a `fetch(limit, after)`
+    callable; the cursor encodes the last hit of the page, so the next page
+    starts strictly after it and never needs an OFFSET or a COUNT(*).
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            product_id, score = b64decode(encoded.encode('ascii')).decode('ascii').split(':')
+            return int(product_id), float(score)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, hit):
+        product_id, score = hit
+        return b64encode(f'{product_id}:{score!r}'.encode('ascii')).decode('ascii')
+
+    def paginate_hits(self, fetch, request):
+        self.request = request
+        hits = fetch(self.page_size + 1, self.decode_cursor(request))
+        page = hits[:self.page_size]
+        self.next_hit = page[-1] if len(hits) > self.page_size else None
+        return page
+
+    def get_next_link(self):
+        if self.next_hit is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_hit))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
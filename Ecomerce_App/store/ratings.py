@@ -0,0 +1,46 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Product, Review
+
+
+def _apply_delta(product_id, count_delta, sum_delta):
+    """Shift a product's stored rating aggregates in a single UPDATE."""
+    Product.objects.filter(pk=product_id).update(
+        rating_count=F('rating_count') + count_delta,
+        rating_sum=F('rating_sum') + sum_delta,
+        updated_at=timezone.now(),
+    )
+
+
+def review_added(review):
+    _apply_delta(review.product_id, 1, review.rating)
+
+
+def review_changed(review, previous_rating):
+    _apply_delta(review.product_id, 0, review.rating - previous_rating)
+
+
+def review_removed(review):
+    _apply_delta(review.product_id, -1, -review.rating)
+
+
+def rebuild_ratings(queryset=None):
+    """
+    Recompute rating_count/rating_sum from the reviews table.
+
+    Runs as one UPDATE with correlated subqueries, so the cost does not
+    depend on how many products are touched. Returns the number of rows
+    updated.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    count = reviews.annotate(c=Count('id')).values('c')
+    total = reviews.annotate(s=Sum('rating')).values('s')
+
+    return queryset.update(
+        rating_count=Coalesce(Subquery(count, output_field=IntegerField()), Value(0)),
+        rating_sum=Coalesce(Subquery(total, output_field=IntegerField()), Value(0)),
+    )
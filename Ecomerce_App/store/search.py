@@ -0,0 +1,255 @@
+"""
+Product full-text search.
+
+Products are tokenized into an index that is kept in sync with Product
+saves (see store.signals) and queried with relevance ranking. Two backends
+ship with the store:
+
+* SQLiteFTSBackend - an FTS5 virtual table ranked with bm25(), used by
+  default on SQLite builds that include FTS5.
+* InvertedIndexBackend - a plain ProductSearchTerm table that works on any
+  database Django supports.
+
+Set STORE_SEARCH_BACKEND to a dotted path to force a specific backend.
+"""
+import re
+from collections import Counter
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Count, Q, Sum, Value, When
+from django.utils.module_loading import import_string
+from .models import Product, ProductSearchTerm
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOPWORDS = frozenset({'a', 'an', 'and', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'})
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TOKENS = 8
+
+# Sorts after any character a term can continue with, so [prefix, prefix + PREFIX_END)
+# is exactly the terms starting with prefix
+PREFIX_END = '\U0010ffff'
+
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    """Split text into lowercase index terms, dropping stopwords."""
+    return [
+        token[:MAX_TOKEN_LENGTH]
+        for token in TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+def query_tokens(query):
+    """Distinct query terms, in order, capped so a query cannot fan out."""
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+
+
+class BaseSearchBackend:
+    def index(self, products):
+        """Add or refresh products in the index; inactive ones are removed."""
+        active = [product for product in products if product.is_active]
+        inactive = [product.pk for product in products if not product.is_active]
+        if inactive:
+            self.remove(inactive)
+        if active:
+            self.write(active)
+
+    def write(self, products):
+        raise NotImplementedError
+
+    def remove(self, product_ids):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, limit, after=None):
+        """
+        Return up to `limit` (product_id, score) hits matching every query
+        term, best match first. `after` is the last hit of the previous page;
+        results continue strictly after it (keyset pagination), so deep
+        pages cost the same as the first one.
+        """
+        raise NotImplementedError
+
+    def rebuild(self, batch_size=1000):
+        """Re-index the whole catalog. Returns the number of products indexed."""
+        indexed = 0
+        with transaction.atomic():
+            self.clear()
+            batch = []
+            for product in Product.objects.active().only('id', 'name', 'description', 'is_active').iterator(chunk_size=batch_size):
+                batch.append(product)
+                if len(batch) == batch_size:
+                    self.write(batch)
+                    indexed += len(batch)
+                    batch = []
+            if batch:
+                self.write(batch)
+                indexed += len(batch)
+        return indexed
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """
+    Term -> product postings stored in ProductSearchTerm.
+
+    The (term, product) unique index serves both exact and prefix lookups
+    (the prefix as a range, since LIKE cannot use it on SQLite, whose LIKE
+    is case-insensitive); a product matches when it has a posting for every query term (the last
+    term also matches as a prefix, for search-as-you-type) and is ranked by
+    the summed weight of its postings.
+    """
+
+    def write(self, products):
+        ProductSearchTerm.objects.filter(product__in=products).delete()
+        postings = []
+        for product in products:
+            weights = Counter()
+            for token in tokenize(product.name):
+                weights[token] += NAME_WEIGHT
+            for token in tokenize(product.description):
+                weights[token] += DESCRIPTION_WEIGHT
+            postings.extend(
+                ProductSearchTerm(term=term, product_id=product.pk, weight=weight)
+                for term, weight in weights.items()
+            )
+        ProductSearchTerm.objects.bulk_create(postings, batch_size=1000)
+
+    def remove(self, product_ids):
+        ProductSearchTerm.objects.filter(product_id__in=product_ids).delete()
+
+    def clear(self):
+        ProductSearchTerm.objects.all().delete()
+
+    def postings(self, exact, prefix):
+        """Postings of active products for the `exact` terms and terms starting with `prefix`."""
+        return ProductSearchTerm.objects.filter(
+            Q(term__in=exact) | Q(term__gte=prefix, term__lt=prefix + PREFIX_END),
+            product__is_active=True,
+        )
+
+    def search(self, query, limit, after=None):
+        tokens = query_tokens(query)
+        if not tokens:
+            return []
+        exact, last = tokens[:-1], tokens[-1]
+
+        # Map every matching posting back to the query term it satisfies so
+        # that "matches all terms" is a distinct count over those labels.
+        matched_token = Case(
+            When(term__in=exact, then='term'),
+            default=Value(last),
+            output_field=CharField(),
+        )
+        postings = self.postings(exact, last)
+
+        hits = (
+            postings
+            .values('product_id')
+            .annotate(matched=Count(matched_token, distinct=True), score=Sum('weight'))
+            .filter(matched=len(tokens))
+        )
+        if after is not None:
+            product_id, score = after
+            hits = hits.filter(Q(score__lt=score) | Q(score=score, product_id__gt=product_id))
+        return list(hits.order_by('-score', 'product_id').values_list('product_id', 'score')[:limit])
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """FTS5 index over product name and description, ranked with bm25()."""
+    table = 'store_product_fts'
+
+    def write(self, products):
+        with connection.cursor() as cursor:
+            self._delete(cursor, [product.pk for product in products])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, name, description) VALUES (%s, %s, %s)',
+                [(product.pk, product.name, product.description) for product in products],
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            self._delete(cursor, product_ids)
+
+    def _delete(self, cursor, product_ids):
+        cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in product_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def match_expression(self, tokens):
+        # Quote every term so user input can never be parsed as FTS syntax
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, query, limit, after=None):
+        tokens = query_tokens(query)
+        if not tokens:
+            return []
+        # bm25() is lower-is-better, so pages continue with larger scores
+        sql = (
+            f'SELECT rowid, score FROM ('
+            f'SELECT rowid, bm25({self.table}, {NAME_WEIGHT}.0, {DESCRIPTION_WEIGHT}.0) AS score '
+            f'FROM {self.table} WHERE {self.table} MATCH %s)'
+        )
+        params = [self.match_expression(tokens)]
+        if after is not None:
+            product_id, score = after
+            sql += ' WHERE score > %s OR (score = %s AND rowid > %s)'
+            params += [score, score, product_id]
+        sql += ' ORDER BY score, rowid LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [tuple(row) for row in cursor.fetchall()]
+
+
+def fts5_table_exists():
+    if connection.vendor != 'sqlite':
+        return False
+    return SQLiteFTSBackend.table in connection.introspection.table_names()
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'STORE_SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        elif fts5_table_exists():
+            _backend = SQLiteFTSBackend()
+        else:
+            _backend = InvertedIndexBackend()
+    return _backend
+
+
+def search_hits(query, limit, after=None):
+    return get_search_backend().search(query, limit, after)
+
+
+def load_products(ids):
+    """Fetch active products for listing, preserving the order of `ids`."""
+    products = Product.objects.active().for_listing().in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
+
+
+def iter_search_batches(query, batch_size=500):
+    """Yield every match as lists of products, one keyset page at a time."""
+    after = None
+    while True:
+        hits = search_hits(query, batch_size, after)
+        if not hits:
+            return
+        yield load_products([pk for pk, score in hits])
+        if len(hits) < batch_size:
+            return
+        after = hits[-1]
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .cache import invalidate
+from .models import Category, Product, ProductImage, Review
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    invalidate('products', f'product:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    invalidate('categories')
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def invalidate_product_image(sender, instance, **kwargs):
+    # Images are part of the product payload; keep its Last-Modified honest
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+    invalidate(f'product:{instance.product_id}')
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review(sender, instance, **kwargs):
+    # Reviews feed the product detail payload and the rating shown in lists
+    invalidate('products', f'product:{instance.product_id}', f'reviews:{instance.product_id}')
@@ -0,0 +1,35 @@
+import json
+from itertools import batched
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_BATCH_SIZE = 500
+
+
+def wants_stream(request):
+    return request.query_params.get('stream') in ('1', 'true')
+
+
+def queryset_batches(queryset, batch_size=STREAM_BATCH_SIZE):
+    """Walk a queryset with a server-side cursor, yielding lists of rows."""
+    return batched(queryset.iterator(chunk_size=batch_size), batch_size)
+
+
+def stream_json_list(batches, serializer_class, context=None):
+    """
+    Stream a JSON array, serializing one batch of objects at a time with
+    `context` (pass the request, as views do, for absolute file URLs).
+
+    Only a single batch is held in memory, however many rows match.
+    """
+    def generate():
+        yield '['
+        separator = ''
+        for batch in batches:
+            data = serializer_class(batch, many=True, context=context).data
+            if data:
+                yield separator + ','.join(json.dumps(item, cls=JSONEncoder) for item in data)
+                separator = ','
+        yield ']'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
@@ -1,3 +1,413 @@
-from django.test import TestCase
+import json
+from unittest import mock
+from io import StringIO
+from decimal import Decimal
+from django.core.management import call_command
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase
+from rest_framework.test import APIClient
+from ecommerce_project.testing import QueryBudgetMixin
+from users.models import CustomUser
+from .cache import get_response_cache
+from .models import Category, Product, ProductImage, Review
+from .search import InvertedIndexBackend, SQLiteFTSBackend, get_search_backend
 
-# Create your tests here.
+
+class StoreTestCase(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username='buyer', email='buyer@example.com', password='pass12345')
+        self.category = Category.objects.create(name='Books')
+        self.product = self.make_product('Clean Code')
+
+    def make_product(self, name, **kwargs):
+        kwargs.setdefault('description', f'{name} description')
+        kwargs.setdefault('price', Decimal('10.00'))
+        kwargs.setdefault('stock_quantity', 10)
+        kwargs.setdefault('category', self.category)
+        return Product.objects.create(name=name, **kwargs)
+
+    def make_user(self, username):
+        return CustomUser.objects.create(username=username, email=f'{username}@example.com')
+
+
+class RatingAggregateTests(StoreTestCase):
+    def test_review_lifecycle_updates_aggregates(self):
+        self.client.force_authenticate(self.user)
+        url = f'/api/store/products/{self.product.pk}/reviews/'
+        self.assertEqual(self.client.post(url, {'rating': 4, 'comment': 'Good'}).status_code, 201)
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (1, 4))
+
+        review = Review.objects.get()
+        response = self.client.patch(f'/api/store/reviews/{review.pk}/', {'rating': 2})
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (1, 2))
+
+        self.assertEqual(self.client.delete(f'/api/store/reviews/{review.pk}/').status_code, 204)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (0, 0))
+        self.assertEqual(self.product.average_rating, 0)
+
+    def test_rebuild_ratings_command(self):
+        Review.objects.create(product=self.product, user=self.user, rating=5)
+        Review.objects.create(product=self.product, user=self.make_user('other'), rating=2)
+        other = self.make_product('Refactoring')
+
+        call_command('rebuild_ratings', batch_size=1, stdout=StringIO())
+
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (2, 7))
+        self.assertEqual(self.product.average_rating, 3.5)
+        self.assertEqual((other.rating_count, other.rating_sum), (0, 0))
+
+
+class CatalogQueryBudgetTests(QueryBudgetMixin, StoreTestCase):
+    def add_products(self, count=5):
+        for i in range(count):
+            category = Category.objects.create(name=f'Category {Category.objects.count()}')
+            product = self.make_product(f'Extra product {i}', category=category)
+            Review.objects.create(product=product, user=self.user, rating=4)
+
+    def add_detail_rows(self, count=5):
+        for i in range(count):
+            ProductImage.objects.create(product=self.product, image=f'products/additional/{i}.jpg')
+            Review.objects.create(product=self.product, user=self.make_user(f'reviewer{i}'), rating=3)
+
+    def get_ok(self, url):
+        def request():
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return request
+
+    def test_product_list(self):
+        self.assertConstantQueries(self.get_ok('/api/store/products/'), self.add_products, limit=3)
+
+    def test_product_detail(self):
+        self.assertConstantQueries(
+            self.get_ok(f'/api/store/products/{self.product.pk}/'), self.add_detail_rows, limit=4,
+        )
+
+    def test_product_reviews(self):
+        Review.objects.create(product=self.product, user=self.user, rating=5)
+        self.assertConstantQueries(
+            self.get_ok(f'/api/store/products/{self.product.pk}/reviews/'), self.add_detail_rows, limit=2,
+        )
+
+    def test_featured(self):
+        self.assertConstantQueries(self.get_ok('/api/store/featured/'), self.add_products, limit=1)
+
+    def test_search(self):
+        self.assertConstantQueries(self.get_ok('/api/store/search/?q=description'), self.add_products, limit=2)
+
+
+class SearchTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_product('Code Complete', description='Practical handbook of software construction')
+        self.make_product('Handbook of Gardening', description='Grow vegetables at home')
+        self.make_product('Pragmatic Programmer', description='Code craftsmanship and clean habits')
+
+    def search_names(self, query, **params):
+        response = self.client.get('/api/store/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.data['results']]
+
+    def test_ranks_name_matches_first(self):
+        names = self.search_names('code')
+        self.assertEqual(set(names[:2]), {'Code Complete', 'Clean Code'})
+        self.assertEqual(names[2], 'Pragmatic Programmer')
+
+    def test_all_terms_must_match_with_prefix_on_last(self):
+        self.assertEqual(self.search_names('handbook soft'), ['Code Complete'])
+        self.assertEqual(self.search_names('gardening nothing'), [])
+
+    def test_index_follows_product_changes(self):
+        product = Product.objects.get(name='Handbook of Gardening')
+        product.name = 'Handbook of Botany'
+        product.save()
+        self.assertEqual(self.search_names('botany'), ['Handbook of Botany'])
+
+        product.is_active = False
+        product.save()
+        self.assertEqual(self.search_names('botany'), [])
+
+        Product.objects.get(name='Code Complete').delete()
+        self.assertNotIn('Code Complete', self.search_names('code'))
+
+    def test_cursor_pagination(self):
+        for i in range(25):
+            self.make_product(f'Widget {i}')
+        first = self.client.get('/api/store/search/', {'q': 'widget'}).data
+        self.assertNotIn('count', first)
+        self.assertEqual(len(first['results']), 20)
+
+        second = self.client.get(first['next']).data
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        names = {product['name'] for product in first['results'] + second['results']}
+        self.assertEqual(names, {f'Widget {i}' for i in range(25)})
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/store/search/', {'q': 'code', 'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_empty_query_returns_nothing(self):
+        self.assertEqual(self.search_names(''), [])
+
+    def test_streaming(self):
+        response = self.client.get('/api/store/search/', {'q': 'code', 'stream': '1'})
+        self.assertTrue(response.streaming)
+        products = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(products), 3)
+
+    def test_backends_agree(self):
+        self.assertIsInstance(get_search_backend(), SQLiteFTSBackend)
+        backend = InvertedIndexBackend()
+        self.assertEqual(backend.rebuild(), 4)
+        names = dict(Product.objects.values_list('pk', 'name'))
+        hits = backend.search('code', 10)
+        ranked = [names[pk] for pk, score in hits]
+        self.assertEqual(set(ranked[:2]), {'Code Complete', 'Clean Code'})
+        self.assertEqual(ranked[2], 'Pragmatic Programmer')
+        self.assertEqual(backend.search('code', 10, after=hits[1]), hits[2:])
+        self.assertEqual([names[pk] for pk, score in backend.search('handbook soft', 10)], ['Code Complete'])
+        self.assertEqual(backend.search('the', 10), [])
+
+    def test_prefix_range_matches_only_the_prefix(self):
+        backend = InvertedIndexBackend()
+        backend.rebuild()
+        terms = set(backend.postings(exact=[], prefix='hand').values_list('term', flat=True))
+        self.assertEqual(terms, {'handbook'})
+
+
+class FeaturedProductsTests(StoreTestCase):
+    def test_cursor_pages_follow_page_size(self):
+        for i in range(24):
+            self.make_product(f'Product {i}')
+        first = self.client.get('/api/store/featured/').data
+        self.assertEqual(len(first['results']), 20)
+        self.assertEqual(first['results'][0]['name'], 'Product 23')
+
+        second = self.client.get(first['next']).data
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+
+    def test_streaming(self):
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+        self.make_product('Visible')
+        response = self.client.get('/api/store/featured/?stream=1')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        products = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([product['name'] for product in products], ['Visible'])
+
+
+class KeysetPaginationTests(QueryBudgetMixin, StoreTestCase):
+    def test_product_list_opt_in_cursor(self):
+        for i in range(29):
+            self.make_product(f'Product {i}')
+
+        paged = self.client.get('/api/store/products/').data
+        self.assertEqual(paged['count'], 30)
+
+        with self.assertMaxQueries(2):
+            first = self.client.get('/api/store/products/', {'pagination': 'cursor'}).data
+        self.assertNotIn('count', first)
+        self.assertIsNone(first['previous'])
+        self.assertEqual(first['results'][0]['name'], 'Product 28')
+
+        second = self.client.get(first['next']).data
+        self.assertIsNone(second['next'])
+        self.assertEqual(len(first['results']) + len(second['results']), 30)
+        self.assertEqual(second['results'][-1]['name'], 'Clean Code')
+
+    def test_cursor_respects_ordering_filter(self):
+        for price in ('5.00', '15.00', '1.00'):
+            self.make_product(f'Priced {price}', price=Decimal(price))
+        data = self.client.get('/api/store/products/', {'pagination': 'cursor', 'ordering': 'price'}).data
+        self.assertEqual([p['price'] for p in data['results']], ['1.00', '5.00', '10.00', '15.00'])
+
+    def test_review_list_opt_in_cursor(self):
+        for i in range(3):
+            Review.objects.create(product=self.product, user=self.make_user(f'reviewer{i}'), rating=i + 1)
+        data = self.client.get(f'/api/store/products/{self.product.pk}/reviews/', {'pagination': 'cursor'}).data
+        self.assertEqual([review['rating'] for review in data['results']], [3, 2, 1])
+
+
+class ResponseCacheTests(QueryBudgetMixin, StoreTestCase):
+    def test_anonymous_reads_are_cached(self):
+        url = f'/api/store/products/{self.product.pk}/'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with self.assertMaxQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(json.loads(response.content)['name'], 'Clean Code')
+        self.assertEqual(get_response_cache().get_stats()['product-detail'], {'hits': 1, 'misses': 1})
+
+    def test_authenticated_reads_bypass_cache(self):
+        self.client.force_login(self.user)
+        self.client.get('/api/store/products/')
+        response = self.client.get('/api/store/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Cache', response)
+
+    def test_product_save_invalidates_lists_and_detail(self):
+        detail = f'/api/store/products/{self.product.pk}/'
+        self.client.get(detail)
+        self.client.get('/api/store/featured/')
+        self.product.price = Decimal('12.50')
+        self.product.save()
+
+        response = self.client.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['price'], '12.50')
+        self.assertEqual(self.client.get('/api/store/featured/').data['results'][0]['price'], '12.50')
+
+    def test_related_changes_invalidate_detail(self):
+        detail = f'/api/store/products/{self.product.pk}/'
+        other = self.make_product('Other')
+        other_detail = f'/api/store/products/{other.pk}/'
+        self.client.get(detail)
+        self.client.get(other_detail)
+
+        Review.objects.create(product=self.product, user=self.user, rating=5)
+        self.assertEqual(len(self.client.get(detail).data['reviews']), 1)
+        self.assertEqual(self.client.get(other_detail)['X-Cache'], 'HIT')
+
+        ProductImage.objects.create(product=self.product, image='products/additional/a.jpg')
+        self.assertEqual(len(self.client.get(detail).data['images']), 1)
+
+        self.category.name = 'Programming'
+        self.category.save()
+        self.assertEqual(self.client.get(other_detail).data['category']['name'], 'Programming')
+
+    def test_lru_backend_is_bounded(self):
+        from .cache import LocalLRUBackend
+        backend = LocalLRUBackend(max_entries=2)
+        backend.set('a', 1, 60)
+        backend.set('b', 2, 60)
+        backend.get('a')
+        backend.set('c', 3, 60)
+        self.assertEqual((backend.get('a'), backend.get('b'), backend.get('c')), (1, None, 3))
+        backend.set('d', 4, -1)
+        self.assertIsNone(backend.get('d'))
+
+    def test_clear_leaves_the_rest_of_a_shared_cache(self):
+        from django.core.cache import cache as shared
+        from .cache import DjangoCacheBackend, ResponseCache
+        response_cache = ResponseCache(DjangoCacheBackend())
+        shared.set('session:abc', 'kept')
+        url = f'/api/store/products/{self.product.pk}/'
+        with mock.patch('store.cache.get_response_cache', return_value=response_cache):
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+            response_cache.clear()
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(shared.get('session:abc'), 'kept')
+
+
+class ConditionalGetTests(QueryBudgetMixin, StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        # Exercise the views themselves rather than the anonymous response cache
+        self.client.force_authenticate(self.user)
+
+    def assertRevalidates(self, url, change):
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertMaxQueries(3):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+        change()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_product_detail(self):
+        def add_image():
+            ProductImage.objects.create(product=self.product, image='products/additional/a.jpg')
+        self.assertRevalidates(f'/api/store/products/{self.product.pk}/', add_image)
+
+    def test_product_detail_review_change(self):
+        url = f'/api/store/products/{self.product.pk}/reviews/'
+        self.assertRevalidates(
+            f'/api/store/products/{self.product.pk}/',
+            lambda: self.client.post(url, {'rating': 5}),
+        )
+
+    def test_product_list(self):
+        self.assertRevalidates('/api/store/products/', lambda: self.make_product('New'))
+
+    def test_product_list_category_rename(self):
+        def rename():
+            self.category.name = 'Software'
+            self.category.save()
+        self.assertRevalidates('/api/store/products/', rename)
+
+    def test_category_list(self):
+        self.assertRevalidates('/api/store/categories/', lambda: Category.objects.create(name='Games'))
+
+    def test_cached_anonymous_response_revalidates(self):
+        self.client.force_authenticate(None)
+        url = f'/api/store/products/{self.product.pk}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['X-Cache']), (304, 'HIT'))
+
+
+class AsyncCatalogTests(StoreTestCase):
+    """The ASGI views must answer exactly like the DRF views they shadow."""
+
+    def setUp(self):
+        super().setUp()
+        for i in range(25):
+            self.make_product(f'Book {i}', price=Decimal('5.00') if i % 2 else Decimal('7.00'),
+                              image=f'products/book-{i}.jpg')
+        self.async_client = AsyncClient()
+
+    async def assertSameResponse(self, url, **headers):
+        sync_response = await sync_to_async(self.client.get)(url, **headers)
+        await sync_to_async(get_response_cache().clear)()
+        async_response = await self.async_client.get(url, **headers)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.json(), sync_response.json())
+        return async_response
+
+    async def test_product_list_matches_sync_view(self):
+        category = self.category.pk
+        for query in ('', '?page=2', f'?category={category}&ordering=-price,name', '?search=Book+1', '?price=5.00',
+                      '?page=9', '?category=999', '?category=x', '?price=abc', '?price=5.00&category=999',
+                      '?pagination=cursor'):
+            with self.subTest(query=query):
+                await self.assertSameResponse(f'/api/store/products/{query}')
+
+    async def test_detail_featured_and_search_match_sync_views(self):
+        for url in (f'/api/store/products/{self.product.pk}/', '/api/store/products/0/',
+                    '/api/store/featured/', '/api/store/search/?q=book', '/api/store/search/?q=book&cursor=bad'):
+            with self.subTest(url=url):
+                await self.assertSameResponse(url)
+
+    async def test_async_views_keep_validators_and_cache(self):
+        url = f'/api/store/products/{self.product.pk}/'
+        first = await self.async_client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual((await self.async_client.get(url))['X-Cache'], 'HIT')
+        self.assertEqual((await self.async_client.get(url, headers={'If-None-Match': first['ETag']})).status_code, 304)
+
+    async def test_plain_reads_do_not_touch_drf_views(self):
+        from . import views
+        with mock.patch.object(views.ProductListView, 'get', side_effect=AssertionError), \
+                mock.patch.object(views.ProductDetailView, 'get', side_effect=AssertionError):
+            self.assertEqual((await self.async_client.get('/api/store/products/?page=2')).status_code, 200)
+            self.assertEqual((await self.async_client.get(f'/api/store/products/{self.product.pk}/')).status_code, 200)
+
+    async def test_writes_fall_back_to_drf(self):
+        response = await self.async_client.post('/api/store/products/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
@@ -12,4 +12,5 @@ urlpatterns = [
     path('reviews/<int:pk>/', views.ReviewDetailView.as_view(), name='review-detail'),
     path('featured/', views.featured_products, name='featured-products'),
     path('search/', views.search_products, name='search-products'),
+    path('cache/stats/', views.cache_stats, name='cache-stats'),
 ]
@@ -2,7 +2,15 @@ from rest_framework import generics, permissions, filters, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.utils.decorators import method_decorator
+from ecommerce_project.conditional import ConditionalGetMixin, aggregate_validators
+from ecommerce_project.pagination import OptInCursorPagination
 from .models import Category, Product, Review
+from . import ratings, search
+from .cache import cache_anonymous_get, get_response_cache
+from .pagination import NewestFirstCursorPagination, RankedCursorPagination
+from .streaming import queryset_batches, stream_json_list, wants_stream
 from .serializers import (
     CategorySerializer, 
     ProductSerializer, 
@@ -11,19 +19,38 @@ from .serializers import (
     ReviewCreateSerializer
 )
 
-class CategoryListView(generics.ListCreateAPIView):
+def catalog_namespaces(kwargs):
+    return ['products', 'categories']
+
+def category_namespaces(kwargs):
+    return ['categories']
+
+def product_detail_namespaces(kwargs):
+    return ['categories', f"product:{kwargs['pk']}"]
+
+def product_review_namespaces(kwargs):
+    return [f"reviews:{kwargs['product_pk']}"]
+
+@method_decorator(cache_anonymous_get('category-list', category_namespaces, timeout=300), name='dispatch')
+class CategoryListView(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_validators(self):
+        return aggregate_validators(self.filter_queryset(self.get_queryset()))
+
+@method_decorator(cache_anonymous_get('category-detail', category_namespaces, timeout=300), name='dispatch')
 class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class ProductListView(generics.ListCreateAPIView):
-    queryset = Product.objects.filter(is_active=True)
+@method_decorator(cache_anonymous_get('product-list', catalog_namespaces, timeout=60), name='dispatch')
+class ProductListView(ConditionalGetMixin, generics.ListCreateAPIView):
+    queryset = Product.objects.active().for_listing()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = OptInCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'price']
     search_fields = ['name', 'description']
@@ -35,58 +62,102 @@ class ProductListView(generics.ListCreateAPIView):
             return ProductListSerializer
         return ProductSerializer
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.filter(is_active=True)
+    def get_validators(self):
+        # Listed products embed their category, so category edits count too
+        return aggregate_validators(self.filter_queryset(self.get_queryset()), 'updated_at', 'category__updated_at')
+
+@method_decorator(cache_anonymous_get('product-detail', product_detail_namespaces, timeout=300), name='dispatch')
+class ProductDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Product.objects.active().for_detail()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_validators(self):
+        # Review and image changes touch Product.updated_at (see store.ratings/store.signals)
+        row = Product.objects.active().filter(pk=self.kwargs['pk']).values_list(
+            'updated_at', 'category__updated_at'
+        ).first()
+        if row is None:
+            return None
+        return row, max(row)
+
+@method_decorator(cache_anonymous_get('product-reviews', product_review_namespaces, timeout=120), name='dispatch')
 class ProductReviewListView(generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = OptInCursorPagination
 
     def get_queryset(self):
         product_id = self.kwargs['product_pk']
-        return Review.objects.filter(product_id=product_id)
+        return Review.objects.filter(product_id=product_id).select_related('user').order_by('-created_at', '-id')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return ReviewCreateSerializer
         return ReviewSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
         product_id = self.kwargs['product_pk']
-        serializer.save(user=self.request.user, product_id=product_id)
+        review = serializer.save(user=self.request.user, product_id=product_id)
+        ratings.review_added(review)
 
 class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Review.objects.filter(user=self.request.user)
+        return Review.objects.filter(user=self.request.user).select_related('user')
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous_rating = serializer.instance.rating
+        review = serializer.save()
+        ratings.review_changed(review, previous_rating)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        ratings.review_removed(instance)
+        instance.delete()
+
+@cache_anonymous_get('featured-products', catalog_namespaces, timeout=300)
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def featured_products(request):
-    """Get featured products (top rated or newest)"""
-    products = Product.objects.filter(is_active=True)[:8]
-    serializer = ProductListSerializer(products, many=True)
-    return Response(serializer.data)
+    """Get featured products (newest first), cursor-paginated or streamed with ?stream=1"""
+    products = Product.objects.active().for_listing()
+    if wants_stream(request):
+        return stream_json_list(
+            queryset_batches(products.order_by('-created_at', '-id')), ProductListSerializer,
+            context={'request': request},
+        )
+
+    paginator = NewestFirstCursorPagination()
+    page = paginator.paginate_queryset(products, request)
+    serializer = ProductListSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
 
+@cache_anonymous_get('search-products', catalog_namespaces, timeout=60)
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def search_products(request):
-    """Search products by name or description"""
-    query = request.GET.get('q', '')
-    if query:
-        products = Product.objects.filter(
-            name__icontains=query, 
-            is_active=True
-        ) | Product.objects.filter(
-            description__icontains=query, 
-            is_active=True
+    """Search products by name or description, best matches first"""
+    query = request.GET.get('q', '').strip()
+    if wants_stream(request):
+        return stream_json_list(
+            search.iter_search_batches(query), ProductListSerializer, context={'request': request},
         )
-    else:
-        products = Product.objects.filter(is_active=True)
-    
-    serializer = ProductListSerializer(products, many=True)
-    return Response(serializer.data)
+
+    paginator = RankedCursorPagination()
+    hits = paginator.paginate_hits(
+        lambda limit, after: search.search_hits(query, limit, after), request
+    )
+    products = search.load_products([product_id for product_id, score in hits])
+    serializer = ProductListSerializer(products, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request):
+    """Response cache hit/miss counters for this process, per view"""
+    return Response(get_response_cache().get_stats())
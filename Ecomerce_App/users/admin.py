@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Address
+from .models import AuthToken, CustomUser, Address
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -19,3 +19,11 @@ class AddressAdmin(admin.ModelAdmin):
     list_filter = ('country', 'state', 'is_default')
     search_fields = ('user__username', 'street_address', 'city')
     ordering = ('-created_at',)
+
+@admin.register(AuthToken)
+class AuthTokenAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at', 'expires_at')
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'user__email')
+    raw_id_fields = ('user',)
+    ordering = ('-created_at',)
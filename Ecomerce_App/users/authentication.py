@@ -0,0 +1,146 @@
+"""
+Token authentication with an in-process token cache.
+
+DRF's TokenAuthentication joins the token table to the user table on
+every request. CachedTokenAuthentication keeps recently used tokens, with
+their user, in a bounded per-process LRU so steady-state authenticated
+requests make no authentication query; expiry and sliding refresh
+(users/tokens.py) are checked against the cached token. users.signals
+evicts a token as soon as it is deleted (logout) and every token of a user
+when the user is saved or deleted, so deactivation takes effect at once in
+the process that made the change; other worker processes notice within
+TIMEOUT seconds.
+
+Configure with the TOKEN_AUTH_CACHE setting:
+
+    TOKEN_AUTH_CACHE = {'MAX_ENTRIES': 10000, 'TIMEOUT': 60}
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from .models import AuthToken
+from .tokens import arefresh_token, is_expired, refresh_due, refresh_token
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TIMEOUT = 60
+
+
+class TokenCache:
+    """Bounded LRU of key -> Token (with its user), expiring after `timeout` seconds."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, timeout=DEFAULT_TIMEOUT):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            token, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._discard(key)
+                return None
+            self._data.move_to_end(key)
+            return token
+
+    def set(self, token):
+        with self._lock:
+            self._discard(token.key)
+            self._data[token.key] = (token, time.monotonic() + self.timeout)
+            self._keys_by_user.setdefault(token.user_id, set()).add(token.key)
+            while len(self._data) > self.max_entries:
+                self._discard(next(iter(self._data)))
+
+    def evict(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def evict_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._keys_by_user.clear()
+
+    def _discard(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            user_id = entry[0].user_id
+            keys = self._keys_by_user.get(user_id)
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    def __len__(self):
+        return len(self._data)
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        config = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+        _token_cache = TokenCache(
+            max_entries=config.get('MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+            timeout=config.get('TIMEOUT', DEFAULT_TIMEOUT),
+        )
+    return _token_cache
+
+
+def authenticated(token):
+    """(user, token) for a cached token; the user is a copy, as views may modify request.user."""
+    return copy.copy(token.user), token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        token = cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(token)
+        if is_expired(token):
+            cache.evict(key)
+            raise AuthenticationFailed('Token has expired.')
+        if refresh_due(token):
+            refresh_token(token)
+        return authenticated(token)
+
+    def authenticate_header(self, request):
+        # Unauthenticated requests keep getting 403, as when session
+        # authentication came first, rather than 401 with WWW-Authenticate
+        return None
+
+
+async def aauthenticate_token(key):
+    """Async counterpart of CachedTokenAuthentication.authenticate_credentials."""
+    cache = get_token_cache()
+    token = cache.get(key)
+    if token is None:
+        token = await AuthToken.objects.select_related('user').filter(key=key).afirst()
+        if token is None:
+            raise AuthenticationFailed('Invalid token.')
+        if not token.user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        cache.set(token)
+    if is_expired(token):
+        cache.evict(key)
+        raise AuthenticationFailed('Token has expired.')
+    if refresh_due(token):
+        await arefresh_token(token)
+    return authenticated(token)
@@ -0,0 +1,26 @@
+from django.utils import timezone
+from ecommerce_project.hot_queries import hot_query, view_queryset
+from .models import AuthToken, CustomUser
+from .tokens import expired_tokens as expired_tokens_at
+from .views import AddressListCreateView, default_addresses
+
+
+@hot_query('token-auth')
+def token_auth():
+    # TokenAuthentication.authenticate_credentials() on a token cache miss
+    return AuthToken.objects.select_related('user').filter(key='key')
+
+
+@hot_query('expired-tokens')
+def expired_tokens():
+    return expired_tokens_at(timezone.now()).values_list('pk', flat=True)[:1000]
+
+
+@hot_query('user-addresses')
+def user_addresses():
+    return view_queryset(AddressListCreateView)
+
+
+@hot_query('default-address')
+def default_address():
+    return default_addresses(CustomUser(pk=1))
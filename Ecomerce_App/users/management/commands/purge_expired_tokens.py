@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ecommerce_project.purge import delete_in_batches
+from users.tokens import expired_tokens
+
+class Command(BaseCommand):
+    help = 'Delete API tokens past their expiry'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of tokens to delete per statement',
+        )
+
+    def handle(self, *args, **options):
+        purged = delete_in_batches(expired_tokens(timezone.now()), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} expired tokens'))
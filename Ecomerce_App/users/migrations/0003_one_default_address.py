@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+def keep_newest_default(apps, schema_editor):
+    Address = apps.get_model('users', 'Address')
+    seen = set()
+    stale = []
+    for address in Address.objects.filter(is_default=True).order_by('user_id', '-created_at', '-id'):
+        if address.user_id in seen:
+            stale.append(address.pk)
+        seen.add(address.user_id)
+    Address.objects.filter(pk__in=stale).update(is_default=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_auth_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_newest_default, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='address',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('user',), name='address_one_default_per_user'),
+        ),
+    ]
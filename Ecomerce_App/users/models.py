@@ -1,3 +1,4 @@
+import secrets
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
@@ -23,6 +24,27 @@ class Address(models.Model):
 
     class Meta:
         verbose_name_plural = "Addresses"
+        constraints = [
+            # Also the index for looking up a user's default address
+            models.UniqueConstraint(
+                fields=['user'], condition=models.Q(is_default=True), name='address_one_default_per_user',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.street_address}, {self.city}, {self.state}"
+
+class AuthToken(models.Model):
+    """An API token; users may hold several (one per login) until each expires."""
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='auth_tokens')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = secrets.token_hex(20)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Token for {self.user} (expires {self.expires_at:%Y-%m-%d %H:%M})"
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import get_token_cache
+from .models import AuthToken, CustomUser
+
+
+@receiver(post_delete, sender=AuthToken)
+def evict_token(sender, instance, **kwargs):
+    get_token_cache().evict(instance.key)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def evict_user_tokens(sender, instance, **kwargs):
+    # Covers deactivation as well as any other change to the cached user
+    get_token_cache().evict_user(instance.pk)
@@ -1,3 +1,182 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from cart.models import Cart
+from ecommerce_project.ratelimit import CacheBucketStore, get_bucket_store
+from .authentication import get_token_cache
+from .models import AuthToken, CustomUser
+from .tokens import issue_token, token_ttl
 
-# Create your tests here.
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = CustomUser.objects.create(username='buyer', email='buyer@example.com')
+        Cart.objects.create(user=self.user)
+        self.token = issue_token(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get('/api/cart/').status_code, 200)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get('/api/cart/').status_code, 200)
+        self.assertFalse(any('users_authtoken' in query['sql'] for query in context.captured_queries))
+
+    def test_logout_invalidates_the_token_at_once(self):
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/orders/').status_code, 403)
+
+    def test_deactivation_invalidates_the_token_at_once(self):
+        self.assertEqual(self.client.get('/api/orders/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/orders/').status_code, 403)
+
+    def test_cache_is_bounded(self):
+        cache = get_token_cache()
+        max_entries, cache.max_entries = cache.max_entries, 2
+        try:
+            for username in ('a', 'b', 'c'):
+                user = CustomUser.objects.create(username=username, email=f'{username}@example.com')
+                cache.set(issue_token(user))
+            self.assertEqual(len(cache), 2)
+        finally:
+            cache.max_entries = max_entries
+
+
+class TokenExpiryTests(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        get_bucket_store().clear()
+        self.user = CustomUser.objects.create(username='buyer', email='buyer@example.com')
+        self.user.set_password('secret')
+        self.user.save()
+
+    def login(self):
+        response = self.client.post('/api/auth/login/', {'username': 'buyer', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['token']
+
+    def get_orders(self, key):
+        return self.client.get('/api/orders/', HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_each_login_issues_its_own_key(self):
+        first, second = self.login(), self.login()
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.get_orders(first).status_code, 200)
+        self.assertEqual(self.get_orders(second).status_code, 200)
+
+    def test_expired_token_is_rejected_even_when_cached(self):
+        key = self.login()
+        self.assertEqual(self.get_orders(key).status_code, 200)
+        AuthToken.objects.filter(pk=key).update(expires_at=timezone.now() - timedelta(seconds=1))
+        get_token_cache().get(key).expires_at = timezone.now() - timedelta(seconds=1)
+        self.assertEqual(self.get_orders(key).status_code, 403)
+
+    def test_use_slides_expiry_at_most_hourly(self):
+        key = self.login()
+        stale = timezone.now() + token_ttl() - timedelta(hours=2)
+        AuthToken.objects.filter(pk=key).update(expires_at=stale)
+        self.assertEqual(self.get_orders(key).status_code, 200)
+        refreshed = AuthToken.objects.get(pk=key).expires_at
+        self.assertGreater(refreshed, stale)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.get_orders(key).status_code, 200)
+        self.assertFalse(any('users_authtoken' in query['sql'] for query in context.captured_queries))
+
+    def test_purge_deletes_expired_tokens_only(self):
+        live = issue_token(self.user)
+        expired = [issue_token(self.user) for _ in range(3)]
+        AuthToken.objects.filter(pk__in=[token.pk for token in expired]).update(expires_at=timezone.now())
+
+        call_command('purge_expired_tokens', batch_size=2, stdout=StringIO())
+        self.assertEqual(list(AuthToken.objects.values_list('pk', flat=True)), [live.pk])
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.user = CustomUser.objects.create(username='buyer', email='buyer@example.com')
+
+    def login(self, username='buyer', ip='10.0.0.1'):
+        return self.client.post('/api/auth/login/', {'username': username, 'password': 'wrong'}, REMOTE_ADDR=ip)
+
+    def test_login_is_limited_per_username_before_hashing(self):
+        for _ in range(5):
+            self.assertEqual(self.login(ip=f'10.0.0.{_}').status_code, 401)
+        with mock.patch('users.views.authenticate') as authenticate:
+            response = self.login(username='Buyer', ip='10.0.1.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        authenticate.assert_not_called()
+        self.assertEqual(self.login(username='someone-else').status_code, 401)
+
+    def test_shared_store_clear_leaves_the_cache_alone(self):
+        from django.core.cache import cache
+        cache.set('session:abc', 'kept')
+        CacheBucketStore().clear()
+        self.assertEqual(cache.get('session:abc'), 'kept')
+
+    @override_settings(RATE_LIMITS={'RATES': {'login-ip': '3/min'}})
+    def test_login_is_limited_per_ip(self):
+        for username in ('a', 'b', 'c'):
+            self.assertEqual(self.login(username=username).status_code, 401)
+        self.assertEqual(self.login(username='d').status_code, 429)
+        self.assertEqual(self.login(username='d', ip='10.0.0.2').status_code, 401)
+
+    @override_settings(RATE_LIMITS={'RATES': {'login-ip': '3/min'}})
+    def test_spoofed_forwarded_for_does_not_get_a_fresh_bucket(self):
+        for i in range(3):
+            response = self.client.post(
+                '/api/auth/login/', {'username': f'user{i}', 'password': 'wrong'},
+                REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f'203.0.113.{i}',
+            )
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'user9', 'password': 'wrong'},
+            REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.9',
+        )
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(RATE_LIMITS={'RATES': {'write-user': '2/min'}})
+    def test_writes_are_limited_per_user_and_reads_are_not(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            self.assertEqual(self.client.delete('/api/cart/clear/').status_code, 404)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.delete('/api/cart/clear/').status_code, 429)
+        self.assertFalse(any('cart_' in query['sql'] for query in context.captured_queries))
+        self.assertEqual(self.client.get('/api/orders/').status_code, 200)
+
+
+class DefaultAddressTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='buyer', email='buyer@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_address(self, **fields):
+        data = {
+            'street_address': '1 Main St', 'city': 'Springfield', 'state': 'IL',
+            'postal_code': '62701', 'country': 'US', **fields,
+        }
+        response = self.client.post('/api/auth/addresses/', data)
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_new_default_replaces_the_old_one(self):
+        first = self.add_address(is_default=True)
+        second = self.add_address(is_default=True)
+        self.assertEqual(list(self.user.addresses.filter(is_default=True).values_list('pk', flat=True)), [second])
+
+        response = self.client.patch(f'/api/auth/addresses/{first}/', {'is_default': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.user.addresses.filter(is_default=True).values_list('pk', flat=True)), [first])
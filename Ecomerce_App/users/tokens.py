@@ -0,0 +1,47 @@
+"""
+Expiring API tokens.
+
+Every login issues a fresh AuthToken valid for AUTH_TOKEN_TTL_DAYS. Using
+a token slides its expiry forward, but at most once per REFRESH_INTERVAL,
+so an active client costs one UPDATE an hour rather than one per request.
+Expired tokens are rejected on use and removed in batches by
+`manage.py purge_expired_tokens`, which walks the expires_at index.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import AuthToken
+
+DEFAULT_TTL_DAYS = 14
+REFRESH_INTERVAL = timedelta(hours=1)
+
+
+def token_ttl():
+    return timedelta(days=getattr(settings, 'AUTH_TOKEN_TTL_DAYS', DEFAULT_TTL_DAYS))
+
+
+def issue_token(user):
+    return AuthToken.objects.create(user=user, expires_at=timezone.now() + token_ttl())
+
+
+def is_expired(token, now=None):
+    return token.expires_at <= (now or timezone.now())
+
+
+def refresh_due(token, now=None):
+    """True when the sliding expiry has not been pushed forward for REFRESH_INTERVAL."""
+    return token.expires_at < (now or timezone.now()) + token_ttl() - REFRESH_INTERVAL
+
+
+def refresh_token(token, now=None):
+    token.expires_at = (now or timezone.now()) + token_ttl()
+    AuthToken.objects.filter(pk=token.pk).update(expires_at=token.expires_at)
+
+
+async def arefresh_token(token, now=None):
+    token.expires_at = (now or timezone.now()) + token_ttl()
+    await AuthToken.objects.filter(pk=token.pk).aupdate(expires_at=token.expires_at)
+
+
+def expired_tokens(now):
+    return AuthToken.objects.filter(expires_at__lte=now)
@@ -1,9 +1,12 @@
 from rest_framework import generics, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from .models import CustomUser, Address
+from django.db import transaction
+from cart.guest import guest_token_from, merge_guest_cart
+from ecommerce_project.ratelimit import LoginRateThrottle, RegistrationRateThrottle
+from .models import AuthToken, CustomUser, Address
+from .tokens import issue_token
 from .serializers import (
     UserRegistrationSerializer, 
     UserSerializer, 
@@ -15,12 +18,13 @@ class UserRegistrationView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegistrationRateThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
+        token = issue_token(user)
         return Response({
             'user': UserSerializer(user).data,
             'token': token.key,
@@ -29,6 +33,7 @@ class UserRegistrationView(generics.CreateAPIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([LoginRateThrottle])
 def login_view(request):
     username = request.data.get('username')
     password = request.data.get('password')
@@ -36,7 +41,10 @@ def login_view(request):
     if username and password:
         user = authenticate(username=username, password=password)
         if user:
-            token, created = Token.objects.get_or_create(user=user)
+            # A fresh key on every login; older ones lapse at their expiry
+            token = issue_token(user)
+            # Carry over a cart built before signing in (X-Cart-Token)
+            merge_guest_cart(guest_token_from(request), user)
             return Response({
                 'user': UserSerializer(user).data,
                 'token': token.key,
@@ -53,11 +61,11 @@ def login_view(request):
 
 @api_view(['POST'])
 def logout_view(request):
-    try:
-        request.user.auth_token.delete()
-        return Response({'message': 'Logout successful'})
-    except:
+    if not isinstance(request.auth, AuthToken):
         return Response({'error': 'Logout failed'}, status=status.HTTP_400_BAD_REQUEST)
+    # Delete by key: request.auth is shared with the token cache
+    AuthToken.objects.filter(pk=request.auth.pk).delete()
+    return Response({'message': 'Logout successful'})
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
@@ -66,6 +74,19 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
+def default_addresses(user):
+    return Address.objects.filter(user=user, is_default=True)
+
+def save_address(serializer, user):
+    # A user has at most one default address (address_one_default_per_user)
+    with transaction.atomic():
+        if serializer.validated_data.get('is_default'):
+            previous = default_addresses(user)
+            if serializer.instance is not None:
+                previous = previous.exclude(pk=serializer.instance.pk)
+            previous.update(is_default=False)
+        serializer.save(user=user)
+
 class AddressListCreateView(generics.ListCreateAPIView):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -74,7 +95,7 @@ class AddressListCreateView(generics.ListCreateAPIView):
         return Address.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        save_address(serializer, self.request.user)
 
 class AddressDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AddressSerializer
@@ -82,3 +103,6 @@ class AddressDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         return Address.objects.filter(user=self.request.user)
+
+    def perform_update(self, serializer):
+        save_address(serializer, self.request.user)